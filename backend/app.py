@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers.simulate import router as simulation_router
@@ -5,8 +6,18 @@ from routers.news import router as news_router
 from routers.news_sum_pred import router as news_sum_pred_router
 from routers.admin import router as admin_router
 from routers.data import router as data_router
+from routers.backtest import router as backtest_router
+from services.csv_data.fund_store import fund_store
+from services.series_encoding import SERIES_HEADERS
 
-app = FastAPI(title="Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # FundData_*.csv парсятся один раз при старте, дальше отдаются из памяти
+    fund_store.preload()
+    yield
+
+app = FastAPI(title="Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +25,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=SERIES_HEADERS,
 )
 @app.get("/")
 def root():
@@ -24,3 +36,4 @@ app.include_router(news_router)
 app.include_router(news_sum_pred_router)
 app.include_router(admin_router)
 app.include_router(data_router)
+app.include_router(backtest_router)
@@ -0,0 +1,41 @@
+# bench_average_mu.py
+# Бенчмарк simulate_price_series против прежнего цикла: python benchmarks/bench_average_mu.py
+# (эквивалентность проверяет tests/test_average_mu.py)
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.average_mu import _step_params, simulate_price_series  # noqa: E402
+
+ARGS = dict(P0=100.0, mu_daily=0.0005, sigma_daily=0.02, nu=5, clip_limit=0.05, seed=42)
+
+
+def loop_price_series(P0, mu_daily, sigma_daily, n_steps, nu, clip_limit, seed, trend):
+    # прежняя реализация: цена шаг за шагом в цикле Python
+    rng = np.random.default_rng(seed)
+    mu_step, sigma_step = _step_params(mu_daily, sigma_daily, n_steps, trend)
+    eps = np.clip(rng.standard_t(df=nu, size=n_steps) * sigma_step, -clip_limit, clip_limit)
+    price = np.empty(n_steps, dtype=float)
+    price[0] = P0 * np.exp(mu_step + eps[0])
+    for t in range(1, n_steps):
+        price[t] = price[t - 1] * np.exp(mu_step + eps[t])
+    return price
+
+
+def main() -> None:
+    print(f"{'n_steps':>9}{'loop, ms':>12}{'cumsum, ms':>13}{'speedup':>9}")
+    for n in (390, 10_000, 100_000, 1_000_000):
+        t0 = time.perf_counter()
+        loop_price_series(n_steps=n, trend="standard", **ARGS)
+        t1 = time.perf_counter()
+        simulate_price_series(n_steps=n, as_array=True, **ARGS)
+        t2 = time.perf_counter()
+        print(f"{n:>9}{(t1 - t0) * 1e3:>12.2f}{(t2 - t1) * 1e3:>13.2f}{(t1 - t0) / (t2 - t1):>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+from datetime import date
+from typing import Dict, List, Literal, Optional
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from services.backtest import DEFAULT_LOOKBACK, run_backtest
+
+router = APIRouter(tags=["backtest"])
+
+class BacktestPayload(BaseModel):
+    tickers: Optional[List[str]] = None  # по умолчанию — все FundData_*.csv
+    initial_wallet: float = Field(10_000.0, gt=0)
+    start: Optional[date] = Field(None, alias="from")
+    end: Optional[date] = Field(None, alias="to")
+    signal: Literal["momentum", "static"] = "momentum"
+    confidences: Optional[Dict[str, float]] = None  # для static; иначе снимок company_confidences.json
+    lookback: int = Field(DEFAULT_LOOKBACK, ge=1, le=1000)
+    rebalance_every: int = Field(1, ge=1, le=1000)
+    # сетки порогов generate_trades: прогоняются все комбинации
+    max_company_share: List[float] = [0.25]
+    min_buy_confidence: List[float] = [0.5]
+    max_sell_confidence: List[float] = [0.3]
+    include_equity: bool = False
+
+    model_config = {"populate_by_name": True}
+
+@router.post("/backtest")
+def backtest_endpoint(body: BacktestPayload):
+    """
+    Бэктест правил generate_trades (покупка/продажа по уверенности) по истории FundData_*.csv:
+    кривые капитала, оборот и доходности для каждой комбинации порогов.
+    """
+    try:
+        return run_backtest(
+            tickers=body.tickers,
+            initial_wallet=body.initial_wallet,
+            start=np.datetime64(body.start) if body.start else None,
+            end=np.datetime64(body.end) if body.end else None,
+            signal=body.signal,
+            confidences=body.confidences,
+            lookback=body.lookback,
+            rebalance_every=body.rebalance_every,
+            max_company_share=body.max_company_share,
+            min_buy_confidence=body.min_buy_confidence,
+            max_sell_confidence=body.max_sell_confidence,
+            include_equity=body.include_equity,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,37 +1,136 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, Query
-from services.csv_data.csv_import import load_fund_data, load_latest_value
+import json
+from datetime import date
+from typing import List, Literal, Optional
+import numpy as np
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response
+from services.csv_data.fund_query import align_panel, every_nth, lttb, ohlc_buckets, slice_range
+from services.csv_data.fund_store import fund_store
+from services.series_encoding import binary_series_response, negotiate_media_type
 
 router = APIRouter(tags=["fund-data"])
 
+def _date_labels(dates: np.ndarray) -> List[str]:
+    return np.datetime_as_string(dates, unit="D").tolist()
+
+@router.get("/fund/latest")
+def fund_latest_many(tickers: List[str] = Query(..., description="Список тикеров (можно через запятую)")):
+    """
+    Последние значения сразу для нескольких тикеров.
+    Объявлен до /fund/{ticker}, иначе "latest" матчится как тикер.
+    """
+    names = [t for item in tickers for t in item.split(",") if t.strip()]
+    values, missing = fund_store.latest_many(names)
+    return {"items": values, "found": len(values), "missing": missing}
+
 @router.get("/fund/{ticker}")
-def fund_single(ticker: str):
+def fund_single(
+    ticker: str,
+    date_from: Optional[date] = Query(None, alias="from", description="Начало окна (включительно)"),
+    date_to: Optional[date] = Query(None, alias="to", description="Конец окна (включительно)"),
+    every: Optional[int] = Query(None, ge=1, description="Каждая N-я точка"),
+    ohlc: Optional[Literal["weekly", "monthly"]] = Query(None, description="OHLC по неделям/месяцам"),
+    points: Optional[int] = Query(None, ge=3, description="LTTB до заданного числа точек"),
+    accept: Optional[str] = Header(None),
+):
     """
-    Возвращает данные одного тикера из FundData_{TICKER}.csv
+    Возвращает данные одного тикера из FundData_{TICKER}.csv.
+    from/to — окно по датам (бинарный поиск), every / ohlc / points — прореживание
+    на сервере (взаимоисключающие). С ohlc значения в data — {open, high, low, close}.
+    Accept: application/octet-stream | application/x-float32 | application/vnd.apache.arrow.stream
+    — колонки dates/price в бинарном виде вместо JSON-словаря.
     """
+    if sum(opt is not None for opt in (every, ohlc, points)) > 1:
+        raise HTTPException(status_code=400, detail="every, ohlc and points are mutually exclusive")
     try:
-        data = load_fund_data(ticker)
+        series = fund_store.get(ticker)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return data
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    media_type = negotiate_media_type(accept)
+    meta = {"ticker": series.ticker, "count": series.count, "source_file": series.source_file}
+
+    if date_from is None and date_to is None and every is None and ohlc is None and points is None:
+        if media_type is not None:
+            return binary_series_response(media_type, {"price": series.prices}, meta=meta, dates=series.dates)
+        return Response(content=series.as_json(), media_type="application/json")
+
+    dates, prices = slice_range(
+        series.dates,
+        series.prices,
+        None if date_from is None else np.datetime64(date_from, "D"),
+        None if date_to is None else np.datetime64(date_to, "D"),
+    )
+    if ohlc is not None:
+        dates, columns = ohlc_buckets(dates, prices, ohlc)
+    else:
+        if every is not None:
+            dates, prices = every_nth(dates, prices, every)
+        elif points is not None:
+            dates, prices = lttb(dates, prices, points)
+        columns = {"price": prices}
+    meta["count"] = int(dates.size)
+
+    if media_type is not None:
+        return binary_series_response(media_type, columns, meta=meta, dates=dates)
+    labels = _date_labels(dates)
+    if ohlc is not None:
+        values = zip(*(columns[k].tolist() for k in ("open", "high", "low", "close")))
+        data = {d: {"open": o, "high": h, "low": l, "close": c} for d, (o, h, l, c) in zip(labels, values)}
+    else:
+        data = dict(zip(labels, prices.tolist()))
+    return {"ticker": meta["ticker"], "data": data, "count": meta["count"], "source_file": meta["source_file"]}
 
 @router.get("/fund")
-def fund_multi(tickers: List[str] = Query(..., description="Список тикеров")):
+def fund_multi(
+    tickers: List[str] = Query(..., description="Список тикеров (можно через запятую)"),
+    layout: Literal["panel", "items"] = Query("panel", description="panel — общий индекс дат, items — отдельные словари"),
+    join: Literal["outer", "inner"] = Query("outer", description="outer — все даты (пропуски = null), inner — общие даты"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    accept: Optional[str] = Header(None),
+):
     """
     Возвращает данные нескольких тикеров.
+    По умолчанию — выровненная панель: {"dates": [...], "columns": {TICKER: [...]}, ...}.
     """
-    results = []
-    errors = []
-    for t in tickers:
-        try:
-            results.append(load_fund_data(t))
-        except FileNotFoundError:
-            errors.append(t.upper())
-    return {
-        "items": results,
-        "found": len(results),
-        "missing": errors,
-    }
+    names = [t for item in tickers for t in item.split(",") if t.strip()]
+    found, missing = fund_store.get_many(names)
+
+    if layout == "items":
+        results = [s.as_json() for s in found]
+        body = b"".join([
+            b'{"items":[', b",".join(results), b"],",
+            json.dumps({"found": len(results), "missing": missing})[1:].encode("utf-8"),
+        ])
+        return Response(content=body, media_type="application/json")
+
+    start = None if date_from is None else np.datetime64(date_from, "D")
+    end = None if date_to is None else np.datetime64(date_to, "D")
+    windows = [slice_range(s.dates, s.prices, start, end) for s in found]
+    index, columns = align_panel([w[0] for w in windows], [w[1] for w in windows], join)
+
+    names: List[str] = []
+    for s in found:
+        names.append(s.ticker if s.ticker not in names else f"{s.ticker}_{len(names)+1}")
+    meta = {"join": join, "count": int(index.size), "found": len(found), "missing": missing}
+
+    media_type = negotiate_media_type(accept)
+    if media_type is not None:
+        return binary_series_response(media_type, dict(zip(names, columns)), meta=meta, dates=index)
+
+    def _column(values: np.ndarray) -> List[Optional[float]]:
+        if join == "inner":
+            return values.tolist()
+        return np.where(np.isnan(values), None, values).tolist()
+
+    body = json.dumps({
+        "dates": _date_labels(index),
+        "columns": {name: _column(col) for name, col in zip(names, columns)},
+        **meta,
+    })
+    return Response(content=body, media_type="application/json")
 
 @router.get("/fund/{ticker}/latest")
 def fund_latest(ticker: str):
@@ -39,9 +138,9 @@ def fund_latest(ticker: str):
     Возвращает последнее числовое значение из FundData_{TICKER}.csv
     """
     try:
-        val = load_latest_value(ticker)
+        val = fund_store.latest(ticker)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     if val is None:
         raise HTTPException(status_code=404, detail="No numeric data found")
-    return {"ticker": ticker.upper(), "latest": val}
\ No newline at end of file
+    return {"ticker": ticker.upper(), "latest": val}
@@ -1,11 +1,15 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi import APIRouter, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from services.gemini_summarizer.gemini_summarizer import summarize_text
-from services.gemini_summarizer.gemini_predict import news_prediction
+from services.gemini_summarizer.gemini_predict import analyze_article, news_prediction
+from services.gemini_summarizer.gemini_batch import analyze_articles
+from services.gemini_summarizer.llm_cache import llm_cache
 
 router = APIRouter(tags=["gemini"])
 
+MAX_BATCH_TEXTS = 200
+
 
 # ============ Pydantic Models ============
 class SummarizeRequest(BaseModel):
@@ -26,6 +30,17 @@ class PredictionResponse(BaseModel):
     priceImpactScore: float
 
 
+class AnalyzeResponse(BaseModel):
+    summary: str
+    priceImpactExplanation: str
+    priceImpactScore: float
+
+
+class BatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_TEXTS)
+    summary_size: Literal["short", "medium", "long"] = "medium"
+
+
 # ============ Summarize Endpoints ============
 @router.post("/summarize", response_model=SummarizeResponse)
 def summarize_endpoint(request: SummarizeRequest):
@@ -95,33 +110,62 @@ def predict_test_endpoint():
     return result
 
 
+# ============ Analyze Endpoints ============
+@router.post("/analyze", response_model=AnalyzeResponse)
+def analyze_endpoint(request: SummarizeRequest):
+    """
+    Summary and stock price impact prediction in a single model call.
+
+    - **text**: The article text to analyze
+    - **summary_size**: 'short', 'medium' or 'long'
+    """
+    return analyze_article(article_text=request.text, summary_size=request.summary_size)
+
+
 # ============ Batch Endpoints ============
 @router.post("/summarize-batch")
-def summarize_batch_endpoint(
-    texts: List[str] = Query(..., description="List of texts to summarize"),
-    summary_size: str = Query("medium", regex="^(short|medium|long)$")
-):
+def summarize_batch_endpoint(request: BatchRequest):
     """
     Summarize multiple texts in batch.
-    
-    Returns a list of summaries for each input text.
+
+    Articles are packed into a few model calls (see gemini_batch.analyze_articles).
+    Returns a list of summaries for each input text, in input order.
     """
-    results = []
-    for text in texts:
-        result = summarize_text(article_text=text, summary_size=summary_size)
-        results.append(result)
-    return {"summaries": results, "count": len(results)}
+    results = analyze_articles(request.texts, summary_size=request.summary_size)
+    return {"summaries": [{"summary": r["summary"]} for r in results], "count": len(results)}
 
 
 @router.post("/predict-batch")
-def predict_batch_endpoint(texts: List[str] = Query(..., description="List of texts to predict")):
+def predict_batch_endpoint(request: BatchRequest):
     """
     Predict stock price impact for multiple articles in batch.
-    
-    Returns a list of predictions for each input text.
+
+    Returns a list of predictions for each input text, in input order.
+    """
+    results = analyze_articles(request.texts, summary_size=request.summary_size)
+    predictions = [
+        {
+            "priceImpactExplanation": r["priceImpactExplanation"],
+            "priceImpactScore": r["priceImpactScore"],
+        }
+        for r in results
+    ]
+    return {"predictions": predictions, "count": len(predictions)}
+
+
+@router.post("/analyze-batch")
+def analyze_batch_endpoint(request: BatchRequest):
+    """
+    Summary and price impact prediction for multiple articles, several articles per model call.
+    """
+    results = analyze_articles(request.texts, summary_size=request.summary_size)
+    return {"items": results, "count": len(results)}
+
+
+# ============ Cache ============
+@router.get("/llm-cache/stats")
+def llm_cache_stats_endpoint():
+    """
+    Hit/miss counters (per process) and size of the persistent model result cache.
     """
-    results = []
-    for text in texts:
-        result = news_prediction(article_text=text)
-        results.append(result)
-    return {"predictions": results, "count": len(results)}
\ No newline at end of file
+    return llm_cache.stats()
@@ -1,25 +1,32 @@
 # portfolio_api_firebase.py
+from contextlib import asynccontextmanager
 from typing import Dict, Any, List
 
 from fastapi import FastAPI
 from pydantic import BaseModel
 
+from services.csv_data.fund_store import fund_store
+from services.gemini_summarizer.companies import live_companies
 from services.gemini_summarizer.firebase_config import get_firestore_client
 from services.gemini_summarizer.confidence_updater_firebase import (
     apply_news_impact_firebase,
-    get_all_confidences,
+    confidence_cache,
+    get_confidence_snapshot,
 )
-from services.gemini_summarizer.trade import Company, generate_trades
+from services.gemini_summarizer.trade import generate_trades, generate_trades_batch
 
 
-app = FastAPI(title="Firebase Portfolio API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # цены компаний — последние значения FundData_*.csv из памяти,
+    # уверенности — копия коллекции 'comp', которую обновляет on_snapshot
+    fund_store.preload()
+    confidence_cache.start_listener()
+    yield
+    confidence_cache.stop_listener()
 
-SAMPLE_COMPANIES: List[Company] = [
-    Company("MSFT", "Microsoft", 420.0),
-    Company("AAPL", "Apple", 200.0),
-    Company("TSLA", "Tesla", 250.0),
-    Company("NVDA", "NVIDIA", 900.0),
-]
+
+app = FastAPI(title="Firebase Portfolio API", lifespan=lifespan)
 
 
 class ImpactRequest(BaseModel):
@@ -31,6 +38,14 @@ class TradeRequest(BaseModel):
     holdings: Dict[str, int]
 
 
+class BatchTradeRequest(BaseModel):
+    rows: List[TradeRequest]
+    max_company_share: float = 0.25
+    min_buy_confidence: float = 0.5
+    max_sell_confidence: float = 0.3
+    include_hold: bool = True
+
+
 @app.get("/health")
 async def health() -> Dict[str, str]:
     db = get_firestore_client()
@@ -40,7 +55,7 @@ async def health() -> Dict[str, str]:
 
 @app.get("/confidences")
 async def get_confidences_api() -> Dict[str, float]:
-    return get_all_confidences()
+    return get_confidence_snapshot()
 
 
 @app.post("/apply-impact")
@@ -51,11 +66,36 @@ async def apply_impact_api(body: ImpactRequest) -> Dict[str, float]:
 
 @app.post("/trade")
 async def trade_api(body: TradeRequest) -> Dict[str, Any]:
-    confidences = get_all_confidences()
     result = generate_trades(
         wallet_amount=body.wallet,
         holdings=body.holdings,
-        companies=SAMPLE_COMPANIES,
-        confidences=confidences,
+        companies=live_companies(),
+        confidences=get_confidence_snapshot(),
     )
     return result
+
+
+@app.post("/trade/batch")
+def trade_batch_api(body: BatchTradeRequest) -> Dict[str, Any]:
+    """
+    Ночная перебалансировка: ордера для всех кошельков за один вызов
+    с общими ценами и снимком уверенностей.
+    """
+    results = generate_trades_batch(
+        wallets=[row.wallet for row in body.rows],
+        holdings=[row.holdings for row in body.rows],
+        companies=live_companies(),
+        confidences=get_confidence_snapshot(),
+        max_company_share=body.max_company_share,
+        min_buy_confidence=body.min_buy_confidence,
+        max_sell_confidence=body.max_sell_confidence,
+        include_hold=body.include_hold,
+    )
+    return {
+        "count": len(results),
+        "results": results,
+        "notes": (
+            "Heuristic simulation based on per-ticker confidence. "
+            "Not financial advice."
+        ),
+    }
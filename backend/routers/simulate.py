@@ -1,7 +1,20 @@
-from typing import List, Literal, Optional
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from services.average_mu import compute_average, simulate_price_series, simulate_portfolio
+import json
+from typing import Dict, Iterator, List, Literal, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from services.average_mu import (
+    compute_average,
+    iter_price_series,
+    simulate_price_series,
+    simulate_portfolio,
+    simulate_portfolio_ensemble,
+)
+from services.calibration import calibrate_many, calibrate_ticker
+from services.correlation import get_historical_returns
+from services.portfolio_risk import DEFAULT_CONFIDENCE, MAX_RISK_PATHS, portfolio_risk
+from services.series_encoding import binary_series_response, negotiate_media_type
+from services.simulation_sessions import apply_shock, close_session, create_session, next_steps
 
 router = APIRouter(tags=["averages"])
 
@@ -20,12 +33,19 @@ class PortfolioSimItem(BaseModel):
     clip_limit: float = 0.05
     seed: Optional[int] = None
     trend: Literal["standard", "up", "down"] = "standard"
+    calibrate: bool = False  # mu_daily/sigma_daily/nu по истории symbol из FundData_*.csv
 
 class PortfolioPayload(BaseModel):
     portfolio_start: float
     count: int
     configs: List[PortfolioSimItem]
     shares: List[float]
+    correlated: bool = False  # коррелированные шоки по истории FundData_*.csv (нужен symbol)
+    mode: Literal["parametric", "bootstrap"] = "parametric"  # bootstrap — шоки из истории symbol
+    block_size: int = Field(1, ge=1, le=250)  # длина блока для bootstrap (1 — обычный)
+
+class ShockPayload(BaseModel):
+    impacts: Dict[str, float]  # {symbol: изменение цены в процентах}
 
 @router.post("/average")
 def average_endpoint(body: PricesPayload):
@@ -34,6 +54,18 @@ def average_endpoint(body: PricesPayload):
         raise HTTPException(status_code=400, detail="Empty prices")
     return {"average": avg}
 
+@router.get("/calibration")
+def calibration_endpoint(tickers: List[str] = Query(..., description="Список тикеров (можно через запятую)")):
+    """
+    Параметры модели (mu_daily, sigma_daily, nu) по истории FundData_{TICKER}.csv.
+    """
+    names = [t for item in tickers for t in item.split(",") if t.strip()]
+    try:
+        items = calibrate_many(names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "count": len(items)}
+
 @router.post("/simulate/{symbol}")
 def simulate_symbol(
     symbol: str,
@@ -47,8 +79,20 @@ def simulate_symbol(
     startP0: float = Query(100.0, gt=0),
     seed: Optional[int] = Query(None),
     trend: Literal["standard", "up", "down"] = Query("standard"),
+    calibrate: bool = Query(False, description="mu_daily/sigma_daily/nu по истории тикера"),
+    mode: Literal["parametric", "bootstrap"] = Query("parametric", description="bootstrap — шоки из истории тикера"),
+    block_size: int = Query(1, ge=1, le=250, description="Длина блока для bootstrap"),
+    accept: Optional[str] = Header(None),
 ):
+    media_type = negotiate_media_type(accept)
     try:
+        returns = None
+        if mode == "bootstrap":
+            returns = get_historical_returns([symbol])[0]
+            mu_daily = float(returns.mean())  # в params — фактическое историческое среднее
+        elif calibrate:
+            est = calibrate_ticker(symbol)
+            mu_daily, sigma_daily, nu = est["mu_daily"], est["sigma_daily"], est["nu"]
         res = simulate_price_series(
             P0=price,
             mu_daily=mu_daily,
@@ -60,13 +104,17 @@ def simulate_symbol(
             clip_limit=clip_limit,
             seed=seed,
             trend=trend,
+            as_array=media_type is not None,
+            mode=mode,
+            returns=returns,
+            block_size=block_size,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return {
+    result = {
         "symbol": symbol.upper(),
-        "final_price": res["final_price"],
-        "change_rate": res["change_rate"],
+        "final_price": float(res["final_price"]),
+        "change_rate": float(res["change_rate"]),
         "prices": res["prices"],
         "params": {
             "mu_daily": mu_daily,
@@ -77,11 +125,98 @@ def simulate_symbol(
             "useStartP0": useStartP0,
             "startP0": startP0,
             "seed": seed,
-            "trend": trend
+            "trend": trend,
+            "mode": mode,
+            "block_size": block_size,
         },
     }
+    if media_type is not None:
+        prices = result.pop("prices")
+        return binary_series_response(media_type, {"prices": prices}, meta=result)
+    return result
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@router.api_route("/simulate/{symbol}/stream", methods=["GET", "POST"])
+def simulate_symbol_stream(
+    symbol: str,
+    price: float = Query(..., gt=0),
+    mu_daily: float = Query(0.0005),
+    sigma_daily: float = Query(0.02, gt=0),
+    n_steps: int = Query(390, ge=1, le=1_000_000),
+    nu: int = Query(5, ge=1, le=200),
+    clip_limit: float = Query(0.05, gt=0),
+    useStartP0: bool = Query(False),
+    startP0: float = Query(100.0, gt=0),
+    seed: Optional[int] = Query(None),
+    trend: Literal["standard", "up", "down"] = Query("standard"),
+    calibrate: bool = Query(False, description="mu_daily/sigma_daily/nu по истории тикера"),
+    mode: Literal["parametric", "bootstrap"] = Query("parametric", description="bootstrap — шоки из истории тикера"),
+    block_size: int = Query(1, ge=1, le=250, description="Длина блока для bootstrap"),
+    chunk_size: int = Query(10_000, ge=1, le=100_000),
+):
+    """
+    То же, что /simulate/{symbol}, но как Server-Sent Events: путь генерируется кусками
+    по chunk_size шагов и каждый кусок отправляется сразу (event: chunk),
+    в конце — event: done с final_price и change_rate.
+    """
+    # история и калибровка — до начала потока, чтобы ошибка пришла как 400, а не обрыв
+    try:
+        returns = None
+        if mode == "bootstrap":
+            returns = get_historical_returns([symbol])[0]
+            if block_size > returns.size:
+                raise ValueError("block_size must be <= history length ({})".format(returns.size))
+        elif calibrate:
+            est = calibrate_ticker(symbol)
+            mu_daily, sigma_daily, nu = est["mu_daily"], est["sigma_daily"], est["nu"]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    chunks = iter_price_series(
+        P0=price,
+        mu_daily=mu_daily,
+        sigma_daily=sigma_daily,
+        n_steps=n_steps,
+        nu=nu,
+        clip_limit=clip_limit,
+        seed=seed,
+        trend=trend,
+        chunk_size=chunk_size,
+        mode=mode,
+        returns=returns,
+        block_size=block_size,
+    )
+
+    def events() -> Iterator[str]:
+        offset = 0
+        final_price = price
+        for chunk in chunks:
+            yield _sse("chunk", {"offset": offset, "prices": chunk.tolist()})
+            offset += chunk.size
+            final_price = float(chunk[-1])
+        base = startP0 if useStartP0 else price
+        yield _sse("done", {
+            "symbol": symbol.upper(),
+            "n_steps": offset,
+            "final_price": final_price,
+            "change_rate": (final_price - base) / base,
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/simulate_portfolio")
-def simulate_portfolio_endpoint(body: PortfolioPayload):
+def simulate_portfolio_endpoint(
+    body: PortfolioPayload,
+    include_prices: bool = Query(True, description="Include per-component price lists"),
+    accept: Optional[str] = Header(None),
+):
+    media_type = negotiate_media_type(accept)
     if body.count != len(body.configs) or body.count != len(body.shares):
         raise HTTPException(status_code=400, detail="count mismatch with configs/shares")
     try:
@@ -89,7 +224,142 @@ def simulate_portfolio_endpoint(body: PortfolioPayload):
             portfolio_start=body.portfolio_start,
             configs=[cfg.model_dump() for cfg in body.configs],
             shares=body.shares,
+            include_prices=include_prices,
+            correlated=body.correlated,
+            mode=body.mode,
+            block_size=body.block_size,
+            as_array=media_type is not None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if media_type is not None:
+        columns = {"portfolio": portfolio_res.pop("portfolio_series")}
+        for idx, comp in enumerate(portfolio_res["components"]):
+            if "prices" in comp:
+                name = comp["symbol"] or f"ASSET_{idx+1}"
+                if name in columns:
+                    name = f"{name}_{idx+1}"
+                columns[name] = comp.pop("prices")
+        return binary_series_response(media_type, columns, meta=portfolio_res)
+    return portfolio_res
+
+@router.post("/simulate_portfolio/ensemble")
+def simulate_portfolio_ensemble_endpoint(
+    body: PortfolioPayload,
+    n_paths: int = Query(1000, ge=1, le=20_000),
+    seed: Optional[int] = Query(None),
+    bins: int = Query(20, ge=1, le=200),
+):
+    """
+    Monte Carlo ансамбль портфеля: n_paths траекторий за один запрос.
+    Возвращает mean и перцентили 5/25/50/75/95 по шагам и распределение финальных значений.
+    """
+    if body.count != len(body.configs) or body.count != len(body.shares):
+        raise HTTPException(status_code=400, detail="count mismatch with configs/shares")
+    try:
+        ensemble_res = simulate_portfolio_ensemble(
+            portfolio_start=body.portfolio_start,
+            configs=[cfg.model_dump() for cfg in body.configs],
+            shares=body.shares,
+            n_paths=n_paths,
+            seed=seed,
+            bins=bins,
+            correlated=body.correlated,
+            mode=body.mode,
+            block_size=body.block_size,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ensemble_res
+
+@router.post("/portfolio/risk")
+def portfolio_risk_endpoint(
+    body: PortfolioPayload,
+    n_paths: Optional[int] = Query(
+        None, ge=2, le=MAX_RISK_PATHS,
+        description="По умолчанию — максимум для портфеля (max_n_paths в ответе)",
+    ),
+    seed: Optional[int] = Query(None),
+    confidence: List[float] = Query(list(DEFAULT_CONFIDENCE), description="Уровни доверия VaR/CVaR"),
+    risk_free_rate: float = Query(0.0, description="Годовая безрисковая ставка для Sharpe"),
+    bins: int = Query(20, ge=1, le=200),
+):
+    """
+    Риск-метрики портфеля по Monte Carlo: VaR/CVaR, распределение максимальной просадки,
+    волатильность и Sharpe.
+    Число путей ограничено бюджетом n_paths x n_steps x активы (MAX_RISK_DRAWS):
+    10 000 путей доступны для одного актива на 390 шагах, для 30 активов — 512.
+    """
+    if body.count != len(body.configs) or body.count != len(body.shares):
+        raise HTTPException(status_code=400, detail="count mismatch with configs/shares")
+    try:
+        return portfolio_risk(
+            portfolio_start=body.portfolio_start,
+            configs=[cfg.model_dump() for cfg in body.configs],
+            shares=body.shares,
+            n_paths=n_paths,
+            seed=seed,
+            confidence=confidence,
+            risk_free_rate=risk_free_rate,
+            bins=bins,
+            correlated=body.correlated,
+            mode=body.mode,
+            block_size=body.block_size,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# ============ Sessions ============
+@router.post("/simulate_portfolio/session")
+def create_session_endpoint(
+    body: PortfolioPayload,
+    seed: Optional[int] = Query(None),
+):
+    """
+    Создаёт серверную сессию симуляции: RNG и последние цены хранятся на сервере (с TTL),
+    следующие шаги забираются через /next без повторной отправки конфигов.
+    """
+    if body.count != len(body.configs) or body.count != len(body.shares):
+        raise HTTPException(status_code=400, detail="count mismatch with configs/shares")
+    try:
+        return create_session(
+            portfolio_start=body.portfolio_start,
+            configs=[cfg.model_dump() for cfg in body.configs],
+            shares=body.shares,
+            seed=seed,
+            correlated=body.correlated,
+            mode=body.mode,
+            block_size=body.block_size,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return portfolio_res
\ No newline at end of file
+
+@router.post("/simulate_portfolio/session/{session_id}/next")
+def session_next_endpoint(
+    session_id: str,
+    steps: int = Query(1, ge=1, le=1_000_000),
+    include_prices: bool = Query(True, description="Include per-component price deltas"),
+):
+    try:
+        return next_steps(session_id, steps=steps, include_prices=include_prices)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/simulate_portfolio/session/{session_id}/shock")
+def session_shock_endpoint(session_id: str, body: ShockPayload):
+    try:
+        return apply_shock(session_id, body.impacts)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/simulate_portfolio/session/{session_id}")
+def session_close_endpoint(session_id: str):
+    try:
+        close_session(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"session_id": session_id, "closed": True}
@@ -1,6 +1,9 @@
 import numpy as np
-from typing import Sequence, Optional, Literal, Union, List, Dict, Any
+from dataclasses import dataclass
+from typing import Sequence, Optional, Literal, Union, List, Dict, Any, Tuple, Iterator
 import math
+from services.calibration import calibrate_ticker
+from services.correlation import get_cholesky_factor, get_historical_residuals
 
 def compute_average(nums: Sequence[float]) -> Optional[float]:
     if not nums:
@@ -8,6 +11,49 @@ def compute_average(nums: Sequence[float]) -> Optional[float]:
     arr = np.asarray(nums, dtype=np.float64)
     return float(arr.mean())
 
+def _step_params(
+    mu_daily: float,
+    sigma_daily: float,
+    n_steps: int,
+    trend: Literal["standard", "up", "down"] = "standard",
+) -> Tuple[float, float]:
+    """
+    Переводит дневные mu/sigma в параметры одного шага (с учётом trend).
+    """
+    mu_step = mu_daily / n_steps
+    sigma_step = sigma_daily / np.sqrt(n_steps)
+
+    trend_log_step = math.log(1.0 + 0.0025)
+    if trend == "up":
+        mu_step += trend_log_step
+    elif trend == "down":
+        mu_step -= trend_log_step
+    return mu_step, sigma_step
+
+def bootstrap_indices(
+    rng: np.random.Generator,
+    n_obs: int,
+    shape: Tuple[int, ...],
+    block_size: int = 1,
+) -> np.ndarray:
+    """
+    Индексы исторических доходностей для bootstrap, массив формы shape (последняя ось — шаги).
+
+    block_size > 1 — блочный bootstrap: подряд идущие куски истории длины block_size
+    (сохраняют кластеризацию волатильности). Всё одной выборкой стартов блоков.
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be >= 1")
+    if block_size > n_obs:
+        raise ValueError("block_size must be <= history length ({})".format(n_obs))
+    if block_size == 1:
+        return rng.integers(0, n_obs, size=shape)
+    *lead, n = shape
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n_obs - block_size + 1, size=(*lead, n_blocks))
+    idx = (starts[..., None] + np.arange(block_size)).reshape(*lead, n_blocks * block_size)
+    return idx[..., :n]
+
 def simulate_price_series(
     P0: float,
     mu_daily: float,
@@ -19,101 +65,439 @@ def simulate_price_series(
     clip_limit: float = 0.05,
     seed: Optional[int] = None,
     trend: Literal["standard", "up", "down"] = "standard",
+    as_array: bool = False,  # True — prices остаются np.ndarray (для бинарных ответов)
+    mode: Literal["parametric", "bootstrap"] = "parametric",
+    returns: Optional[np.ndarray] = None,  # дневные лог-доходности тикера (для bootstrap)
+    block_size: int = 1,
 ) -> np.ndarray:
 
     
     rng = np.random.default_rng(seed)
 
-    mu_step = mu_daily / n_steps
-    sigma_step = sigma_daily / np.sqrt(n_steps)
-
-    trend_log_step = math.log(1.0 + 0.0025)
-    if trend == "up":
-        mu_step += trend_log_step
-    elif trend == "down":
-        mu_step -= trend_log_step
-
-    eps = rng.standard_t(df=nu, size=n_steps) * sigma_step
+    if mode == "bootstrap":
+        # шоки — пересэмплированные исторические отклонения от средней доходности,
+        # mu_daily — историческое среднее; sigma/nu из параметров не используются
+        if returns is None or returns.size == 0:
+            raise ValueError("bootstrap mode requires historical returns")
+        mu_daily = float(returns.mean())
+        mu_step, sigma_step = _step_params(mu_daily, 1.0, n_steps, trend)
+        eps = (returns - mu_daily)[bootstrap_indices(rng, returns.size, (n_steps,), block_size)]
+        eps *= sigma_step
+    else:
+        mu_step, sigma_step = _step_params(mu_daily, sigma_daily, n_steps, trend)
+        eps = rng.standard_t(df=nu, size=n_steps) * sigma_step
     eps = np.clip(eps, -clip_limit, clip_limit)
 
-    price = np.empty(n_steps, dtype=float)
-    price[0] = P0 * np.exp(mu_step + eps[0])
+    # price[t] = P0 * exp(sum_{k<=t}(mu_step + eps[k])) — накопленные лог-доходности
+    # вместо пошагового цикла, тот же seed даёт ту же траекторию
+    log_path = np.cumsum(mu_step + eps)
+    price = P0 * np.exp(log_path)
 
-    for t in range(1, n_steps):
-        price[t] = price[t - 1] * np.exp(mu_step + eps[t])
     if useStartP0:
         change_rate = (price[-1] - startP0) / startP0
     else:
         change_rate = (price[-1] - P0) / P0
 
-    prices = price.tolist()
+    prices = price if as_array else price.tolist()
     return {
         "prices": prices,
         "final_price": price[-1],
         "change_rate": change_rate
     }
+
+def iter_price_series(
+    P0: float,
+    mu_daily: float,
+    sigma_daily: float,
+    n_steps: int = 390,
+    nu: int = 5,
+    clip_limit: float = 0.05,
+    seed: Optional[int] = None,
+    trend: Literal["standard", "up", "down"] = "standard",
+    chunk_size: int = 10_000,
+    mode: Literal["parametric", "bootstrap"] = "parametric",
+    returns: Optional[np.ndarray] = None,  # дневные лог-доходности тикера (для bootstrap)
+    block_size: int = 1,
+) -> Iterator[np.ndarray]:
+    """
+    Та же модель, что simulate_price_series, но путь генерируется кусками по chunk_size
+    шагов: в памяти только текущий кусок, первый кусок готов сразу.
+    Шоки тянутся из того же генератора подряд, поэтому с тем же seed путь совпадает
+    (в bootstrap блоки режутся на границах кусков, так что путь тот же по распределению,
+    но не по seed).
+    """
+    rng = np.random.default_rng(seed)
+    residuals = None
+    if mode == "bootstrap":
+        if returns is None or returns.size == 0:
+            raise ValueError("bootstrap mode requires historical returns")
+        mu_daily = float(returns.mean())
+        residuals = returns - mu_daily
+        mu_step, sigma_step = _step_params(mu_daily, 1.0, n_steps, trend)
+    else:
+        mu_step, sigma_step = _step_params(mu_daily, sigma_daily, n_steps, trend)
+
+    last_price = P0
+    for start in range(0, n_steps, chunk_size):
+        size = min(chunk_size, n_steps - start)
+        if residuals is not None:
+            eps = residuals[bootstrap_indices(rng, residuals.size, (size,), block_size)]
+            eps *= sigma_step
+        else:
+            eps = rng.standard_t(df=nu, size=size) * sigma_step
+        np.clip(eps, -clip_limit, clip_limit, out=eps)
+        eps += mu_step
+        np.cumsum(eps, out=eps)
+        np.exp(eps, out=eps)
+        eps *= last_price
+        last_price = float(eps[-1])
+        yield eps
+
+ENSEMBLE_PERCENTILES = (5, 25, 50, 75, 95)
+MAX_ENSEMBLE_CELLS = 5_000_000  # предел n_paths * n_steps (память под матрицу путей)
+MAX_ENSEMBLE_DRAWS = 20_000_000  # предел n_paths * n_steps * n_assets (время на t-шоки)
+_CHUNK_CELLS = 2_000_000  # сколько шоков (assets * paths * steps) держим в памяти за раз
+
+@dataclass
+class AssetParams:
+    """
+    Параметры активов портфеля в виде векторов длины n_assets.
+    """
+    n_steps: int
+    P0: np.ndarray
+    mu_step: np.ndarray
+    sigma_step: np.ndarray
+    nu: np.ndarray
+    clip_limit: np.ndarray
+    base: np.ndarray  # цена, от которой считается change_rate (P0 или startP0)
+    seeds: List[Optional[int]]
+    symbols: List[Any]
+    chol: Optional[np.ndarray] = None  # фактор Холецкого корреляций (correlated=True)
+    residuals: Optional[np.ndarray] = None  # (assets x days) центрированные доходности для bootstrap
+    block_size: int = 1
+
+def draw_shocks(params: AssetParams, rng: np.random.Generator, shape: Tuple[int, ...]) -> np.ndarray:
+    """
+    Сырые шоки (assets x *shape) для shocks_to_prices: t-распределение либо,
+    в режиме bootstrap, исторические отклонения одним gather по общим для всех
+    активов индексам дат (совместное движение активов сохраняется).
+    """
+    if params.residuals is not None:
+        idx = bootstrap_indices(rng, params.residuals.shape[1], shape, params.block_size)
+        return params.residuals[:, idx]
+    df = params.nu.reshape((-1,) + (1,) * len(shape))
+    return rng.standard_t(df=df, size=(params.P0.size,) + shape)
+
+def shocks_to_prices(
+    eps: np.ndarray,
+    P0: np.ndarray,
+    mu_step: np.ndarray,
+    sigma_step: np.ndarray,
+    clip_limit: np.ndarray,
+    chol: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Превращает сырые t-шоки (assets x ... x steps) в цены, на месте.
+    Параметры — векторы по первой оси (активам). Если задан chol, шоки
+    сначала коррелируются одним умножением L @ eps по оси активов.
+    """
+    if chol is not None:
+        eps = np.tensordot(chol, eps, axes=1)
+    shape = (-1,) + (1,) * (eps.ndim - 1)
+    clip = clip_limit.reshape(shape)
+    eps *= sigma_step.reshape(shape)
+    np.clip(eps, -clip, clip, out=eps)
+    eps += mu_step.reshape(shape)
+    np.cumsum(eps, axis=-1, out=eps)
+    np.exp(eps, out=eps)
+    eps *= P0.reshape(shape)
+    return eps
+
+def simulate_price_matrix(
+    P0: np.ndarray,
+    mu_step: np.ndarray,
+    sigma_step: np.ndarray,
+    nu: np.ndarray,
+    clip_limit: np.ndarray,
+    seeds: Sequence[Optional[int]],
+    n_steps: int,
+    chol: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Симулирует сразу несколько активов и возвращает матрицу цен (assets x steps).
+
+    Все параметры — векторы длины n_assets. Шоки активов без seed тянутся
+    одним вызовом standard_t; активы с seed получают строку из собственного
+    генератора, поэтому (без chol) их траектория совпадает с simulate_price_series.
+    """
+    n_assets = len(seeds)
+    eps = np.empty((n_assets, n_steps), dtype=np.float64)
+
+    unseeded = np.array([i for i, s in enumerate(seeds) if s is None], dtype=np.intp)
+    if unseeded.size:
+        rng = np.random.default_rng()
+        eps[unseeded] = rng.standard_t(df=nu[unseeded, None], size=(unseeded.size, n_steps))
+    for i, s in enumerate(seeds):
+        if s is not None:
+            eps[i] = np.random.default_rng(s).standard_t(df=nu[i], size=n_steps)
+
+    return shocks_to_prices(eps, P0, mu_step, sigma_step, clip_limit, chol)
+
+def _resolve_p0(cfg: Dict[str, Any], idx: int) -> float:
+    price_field = cfg.get("price")
+    prices_arr = cfg.get("prices")
+    if prices_arr is not None and isinstance(prices_arr, (list, tuple)):
+        if len(prices_arr) == 0:
+            raise ValueError("empty prices array in config index {}".format(idx))
+        return float(np.asarray(prices_arr, dtype=np.float64).mean())
+    if price_field is not None:
+        return float(price_field)
+    raise ValueError("config index {} must have 'price' or 'prices'".format(idx))
+
+def _apply_calibration(cfg: Dict[str, Any], idx: int) -> Dict[str, Any]:
+    """
+    calibrate=True: mu_daily / sigma_daily / nu берутся из истории тикера (symbol).
+    """
+    if not cfg.get("calibrate"):
+        return cfg
+    symbol = cfg.get("symbol")
+    if not symbol:
+        raise ValueError("config index {} has calibrate=true but no 'symbol'".format(idx))
+    est = calibrate_ticker(symbol)
+    return {**cfg, "mu_daily": est["mu_daily"], "sigma_daily": est["sigma_daily"], "nu": est["nu"]}
+
+def _require_symbols(configs: List[Dict[str, Any]], what: str) -> List[str]:
+    symbols = [cfg.get("symbol") for cfg in configs]
+    if any(not sym for sym in symbols):
+        raise ValueError("{} requires 'symbol' in every config".format(what))
+    return symbols
+
+def collect_asset_params(
+    configs: List[Dict[str, Any]],
+    correlated: bool = False,
+    mode: Literal["parametric", "bootstrap"] = "parametric",
+    block_size: int = 1,
+) -> AssetParams:
+    """
+    Собирает параметры всех конфигов в векторы для пакетной симуляции.
+    correlated=True подтягивает (кэшированный) фактор Холецкого по symbol конфигов,
+    calibrate=True в конфиге — откалиброванные по истории mu/sigma/nu.
+    mode="bootstrap" — шоки из истории symbol вместо t-распределения
+    (mu_daily — историческое среднее, sigma_daily/nu/calibrate/correlated не нужны).
+    """
+    if not configs:
+        raise ValueError("empty configs")
+    residuals = None
+    if mode == "bootstrap":
+        hist_mu, residuals = get_historical_residuals(_require_symbols(configs, "bootstrap simulation"))
+        if not 1 <= block_size <= residuals.shape[1]:
+            raise ValueError("block_size must be between 1 and {}".format(residuals.shape[1]))
+        configs = [
+            {**cfg, "mu_daily": float(hist_mu[idx]), "sigma_daily": 1.0}
+            for idx, cfg in enumerate(configs)
+        ]
+        correlated = False  # общие даты уже дают корреляцию
+    else:
+        configs = [_apply_calibration(cfg, idx) for idx, cfg in enumerate(configs)]
+
+    n_assets = len(configs)
+    n_steps_list = [int(cfg.get("n_steps", 390)) for cfg in configs]
+    n_steps = n_steps_list[0]
+    if any(n != n_steps for n in n_steps_list):
+        raise ValueError("all simulations must have same n_steps")
+    if n_steps < 1:
+        raise ValueError("n_steps must be >= 1")
+
+    P0 = np.array([_resolve_p0(cfg, idx) for idx, cfg in enumerate(configs)], dtype=np.float64)
+    mu_step = np.empty(n_assets, dtype=np.float64)
+    sigma_step = np.empty(n_assets, dtype=np.float64)
+    for idx, cfg in enumerate(configs):
+        mu_step[idx], sigma_step[idx] = _step_params(
+            float(cfg.get("mu_daily", 0.0005)),
+            float(cfg.get("sigma_daily", 0.02)),
+            n_steps,
+            cfg.get("trend", "standard"),
+        )
+    base = np.array(
+        [
+            float(cfg.get("startP0", 100.0)) if bool(cfg.get("useStartP0", False)) else P0[idx]
+            for idx, cfg in enumerate(configs)
+        ],
+        dtype=np.float64,
+    )
+    chol = None
+    if correlated:
+        chol = get_cholesky_factor(_require_symbols(configs, "correlated simulation"))
+    return AssetParams(
+        n_steps=n_steps,
+        P0=P0,
+        mu_step=mu_step,
+        sigma_step=sigma_step,
+        nu=np.array([int(cfg.get("nu", 5)) for cfg in configs], dtype=np.float64),
+        clip_limit=np.array([float(cfg.get("clip_limit", 0.05)) for cfg in configs], dtype=np.float64),
+        base=base,
+        seeds=[cfg.get("seed") for cfg in configs],
+        symbols=[cfg.get("symbol", f"ASSET_{idx+1}") for idx, cfg in enumerate(configs)],
+        chol=chol,
+        residuals=residuals,
+        block_size=block_size,
+    )
+
 def simulate_portfolio(
     portfolio_start: float,
     configs: List[Dict[str, Any]],
     shares: List[Union[int, float]],
+    include_prices: bool = True,
+    correlated: bool = False,
+    as_array: bool = False,
+    mode: Literal["parametric", "bootstrap"] = "parametric",
+    block_size: int = 1,
 ) -> Dict[str, Any]:
     if len(configs) != len(shares):
         raise ValueError("configs length != shares length")
-    if not configs:
-        raise ValueError("empty configs")
 
-    simulations: List[Dict[str, Any]] = []
-    n_steps_ref: Optional[int] = None
+    params = collect_asset_params(configs, correlated=correlated, mode=mode, block_size=block_size)
+    shares_vec = np.asarray(shares, dtype=np.float64)
 
-    for idx, cfg in enumerate(configs):
-        price_field = cfg.get("price")
-        prices_arr = cfg.get("prices")
-        if prices_arr is not None and isinstance(prices_arr, (list, tuple)):
-            if len(prices_arr) == 0:
-                raise ValueError("empty prices array in config index {}".format(idx))
-            P0 = float(np.asarray(prices_arr, dtype=np.float64).mean())
-        elif price_field is not None:
-            P0 = float(price_field)
-        else:
-            raise ValueError("config index {} must have 'price' or 'prices'".format(idx))
-
-        sim = simulate_price_series(
-            P0=P0,
-            mu_daily=float(cfg.get("mu_daily", 0.0005)),
-            sigma_daily=float(cfg.get("sigma_daily", 0.02)),
-            useStartP0=bool(cfg.get("useStartP0", False)),
-            startP0=float(cfg.get("startP0", 100.0)),
-            n_steps=int(cfg.get("n_steps", 390)),
-            nu=int(cfg.get("nu", 5)),
-            clip_limit=float(cfg.get("clip_limit", 0.05)),
-            seed=cfg.get("seed"),
-            trend=cfg.get("trend", "standard"),
+    if params.residuals is not None:
+        # bootstrap: одни индексы дат на все активы, поэтому один генератор на портфель
+        seeds = [s for s in params.seeds if s is not None]
+        rng = np.random.default_rng(seeds or None)
+        prices = shocks_to_prices(
+            draw_shocks(params, rng, (params.n_steps,)),
+            params.P0, params.mu_step, params.sigma_step, params.clip_limit,
         )
-        sim["symbol"] = cfg.get("symbol", f"ASSET_{idx+1}")
-        sim["shares"] = float(shares[idx])
+    else:
+        prices = simulate_price_matrix(
+            params.P0, params.mu_step, params.sigma_step, params.nu,
+            params.clip_limit, params.seeds, params.n_steps, params.chol,
+        )
+
+    # Портфельный временной ряд: сумма(price_t_i * shares_i) одним умножением матрицы на вектор
+    portfolio_series = shares_vec @ prices
+
+    final_prices = prices[:, -1]
+    change_rates = (final_prices - params.base) / params.base
+
+    simulations: List[Dict[str, Any]] = []
+    for idx in range(len(configs)):
+        sim: Dict[str, Any] = {}
+        if include_prices:
+            sim["prices"] = prices[idx] if as_array else prices[idx].tolist()
+        sim["final_price"] = float(final_prices[idx])
+        sim["change_rate"] = float(change_rates[idx])
+        sim["symbol"] = params.symbols[idx]
+        sim["shares"] = float(shares_vec[idx])
         simulations.append(sim)
 
-        steps_now = len(sim["prices"])
-        if n_steps_ref is None:
-            n_steps_ref = steps_now
-        elif n_steps_ref != steps_now:
-            raise ValueError("all simulations must have same n_steps")
-
-    # Расчёт портфельного временного ряда: сумма(price_t_i * shares_i)
-    portfolio_series: List[float] = []
-    for t in range(n_steps_ref):
-        total = 0.0
-        for sim in simulations:
-            total += sim["prices"][t] * sim["shares"]
-        portfolio_series.append(total)
-
-    final_value = portfolio_series[-1]
+    final_value = float(portfolio_series[-1])
     change_rate = (final_value - portfolio_start) / portfolio_start if portfolio_start > 0 else 0.0
 
     return {
         "portfolio_start": float(portfolio_start),
         "portfolio_final_value": float(final_value),
         "portfolio_change_rate": float(change_rate),
-        "portfolio_series": portfolio_series,
+        "portfolio_series": portfolio_series if as_array else portfolio_series.tolist(),
         "components": simulations,
-    }
\ No newline at end of file
+    }
+
+def simulate_portfolio_paths(
+    params: AssetParams,
+    shares: np.ndarray,
+    n_paths: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Симулирует n_paths независимых траекторий портфеля, матрица (paths x steps).
+
+    Шоки тянутся блоками (assets x chunk x steps), чтобы память не зависела
+    от n_paths; стоимость портфеля — свёртка блока с вектором shares.
+    """
+    n_assets = params.P0.size
+    n_steps = params.n_steps
+    out = np.empty((n_paths, n_steps), dtype=np.float64)
+    chunk = max(1, _CHUNK_CELLS // (n_assets * n_steps))
+
+    for start in range(0, n_paths, chunk):
+        stop = min(n_paths, start + chunk)
+        eps = draw_shocks(params, rng, (stop - start, n_steps))
+        prices = shocks_to_prices(
+            eps, params.P0, params.mu_step, params.sigma_step, params.clip_limit, params.chol,
+        )
+        out[start:stop] = np.tensordot(shares, prices, axes=1)
+    return out
+
+def check_ensemble_size(params: AssetParams, n_paths: int, max_draws: int = MAX_ENSEMBLE_DRAWS) -> None:
+    if n_paths * params.n_steps > MAX_ENSEMBLE_CELLS:
+        raise ValueError(
+            "n_paths * n_steps must be <= {}".format(MAX_ENSEMBLE_CELLS)
+        )
+    if n_paths * params.n_steps * params.P0.size > max_draws:
+        raise ValueError(
+            "n_paths * n_steps * assets must be <= {}".format(max_draws)
+        )
+
+def simulate_portfolio_ensemble(
+    portfolio_start: float,
+    configs: List[Dict[str, Any]],
+    shares: List[Union[int, float]],
+    n_paths: int = 1000,
+    seed: Optional[int] = None,
+    bins: int = 20,
+    correlated: bool = False,
+    mode: Literal["parametric", "bootstrap"] = "parametric",
+    block_size: int = 1,
+) -> Dict[str, Any]:
+    """
+    Monte Carlo по портфелю: n_paths траекторий одной пачкой, в ответе только
+    статистика по шагам (mean + перцентили) и распределение финальных значений.
+    Размер ответа не зависит от n_paths.
+    """
+    if len(configs) != len(shares):
+        raise ValueError("configs length != shares length")
+    if n_paths < 1:
+        raise ValueError("n_paths must be >= 1")
+
+    params = collect_asset_params(configs, correlated=correlated, mode=mode, block_size=block_size)
+    check_ensemble_size(params, n_paths)
+    shares_vec = np.asarray(shares, dtype=np.float64)
+
+    rng = np.random.default_rng(seed)
+    paths = simulate_portfolio_paths(params, shares_vec, n_paths, rng)
+
+    step_pct = np.percentile(paths, ENSEMBLE_PERCENTILES, axis=0)
+    final = paths[:, -1]
+    final_pct = np.percentile(final, ENSEMBLE_PERCENTILES)
+    counts, edges = np.histogram(final, bins=bins)
+
+    if portfolio_start > 0:
+        change_rates = (final - portfolio_start) / portfolio_start
+        prob_loss = float(np.mean(final < portfolio_start))
+    else:
+        change_rates = np.zeros_like(final)
+        prob_loss = 0.0
+
+    return {
+        "portfolio_start": float(portfolio_start),
+        "n_paths": int(n_paths),
+        "n_steps": int(params.n_steps),
+        "mean": paths.mean(axis=0).tolist(),
+        "percentiles": {
+            f"p{p}": row.tolist() for p, row in zip(ENSEMBLE_PERCENTILES, step_pct)
+        },
+        "final": {
+            "mean": float(final.mean()),
+            "std": float(final.std()),
+            "min": float(final.min()),
+            "max": float(final.max()),
+            "mean_change_rate": float(change_rates.mean()),
+            "prob_loss": prob_loss,
+            "percentiles": {
+                f"p{p}": float(v) for p, v in zip(ENSEMBLE_PERCENTILES, final_pct)
+            },
+            "histogram": {
+                "counts": counts.tolist(),
+                "edges": edges.tolist(),
+            },
+        },
+    }
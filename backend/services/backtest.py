@@ -0,0 +1,212 @@
+import os
+from itertools import product
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+import numpy as np
+from services.csv_data.fund_query import align_panel, slice_range
+from services.csv_data.fund_store import fund_store
+from services.gemini_summarizer import confidence_updater
+from services.gemini_summarizer.trade import rebalance_arrays
+from services.portfolio_risk import TRADING_DAYS, max_drawdowns
+
+MAX_GRID = 1000  # предел числа комбинаций параметров за один прогон
+DEFAULT_LOOKBACK = 20
+CONFIDENCE_SNAPSHOT = os.path.join(
+    os.path.dirname(confidence_updater.__file__), confidence_updater.DEFAULT_CONFIDENCE_FILE
+)
+
+def _forward_fill(prices: np.ndarray) -> np.ndarray:
+    """
+    Протягивает последнюю известную цену по оси дат (T x C); до первой цены остаётся NaN.
+    """
+    valid = ~np.isnan(prices)
+    idx = np.where(valid, np.arange(prices.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = prices[idx, np.arange(prices.shape[1])]
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+def load_price_panel(
+    tickers: Sequence[str],
+    start: Optional[np.datetime64] = None,
+    end: Optional[np.datetime64] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Цены закрытия тикеров на общем индексе дат (outer join), матрица (days x tickers).
+    Пропуски протянуты вперёд; до начала истории тикера — NaN (не торгуется).
+    """
+    found, missing = fund_store.get_many(list(tickers))
+    if missing:
+        raise ValueError("no fund data for symbols: {}".format(", ".join(missing)))
+    windows = [slice_range(s.dates, s.prices, start, end) for s in found]
+    dates, columns = align_panel([d for d, _ in windows], [p for _, p in windows], join="outer")
+    if dates.size < 2:
+        raise ValueError("not enough history in the requested range")
+    return dates, _forward_fill(np.column_stack(columns))
+
+def momentum_confidence(prices: np.ndarray, lookback: int = DEFAULT_LOOKBACK) -> np.ndarray:
+    """
+    Уверенность из истории цен: ранг доходности за lookback дней среди тикеров в тот же день,
+    нормированный в [0, 1] (лучший — 1). Только прошлые цены, без заглядывания вперёд.
+    Тикеры без цены на обоих концах окна получают 0.
+    """
+    momentum = np.full(prices.shape, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        momentum[lookback:] = prices[lookback:] / prices[:-lookback] - 1.0
+    valid = np.isfinite(momentum)
+    ranks = np.where(valid, momentum, -np.inf).argsort(axis=1).argsort(axis=1)
+    n_valid = valid.sum(axis=1, keepdims=True)
+    ranks = ranks - (prices.shape[1] - n_valid)  # невалидные занимают младшие ранги
+    with np.errstate(invalid="ignore", divide="ignore"):
+        conf = np.where(n_valid > 1, ranks / (n_valid - 1), 0.5)
+    return np.where(valid, conf, 0.0)
+
+def static_confidence(
+    tickers: Sequence[str],
+    n_days: int,
+    confidences: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    Постоянная уверенность (как в generate_trades) на все дни; по умолчанию — снимок company_confidences.json.
+    """
+    if confidences is None:
+        confidences = confidence_updater.load_confidences(CONFIDENCE_SNAPSHOT)
+    upper = {k.upper(): float(v) for k, v in confidences.items()}
+    row = np.array([upper.get(t, 0.0) for t in tickers], dtype=np.float64)
+    return np.broadcast_to(row, (n_days, row.size))
+
+def _param_grid(
+    max_company_share: Sequence[float],
+    min_buy_confidence: Sequence[float],
+    max_sell_confidence: Sequence[float],
+) -> np.ndarray:
+    grid = np.array(list(product(max_company_share, min_buy_confidence, max_sell_confidence)), dtype=np.float64)
+    if grid.size == 0:
+        raise ValueError("empty parameter grid")
+    if grid.shape[0] > MAX_GRID:
+        raise ValueError("parameter grid must have <= {} combinations".format(MAX_GRID))
+    return grid
+
+def replay(
+    prices: np.ndarray,
+    confidence: np.ndarray,
+    initial_wallet: float,
+    grid: np.ndarray,
+    first_day: int = 0,
+    rebalance_every: int = 1,
+) -> Dict[str, np.ndarray]:
+    """
+    Прогоняет правила generate_trades день за днём для всех строк grid
+    (max_company_share, min_buy_confidence, max_sell_confidence) сразу.
+    Цикл только по дням, внутри — rebalance_arrays на (комбинации x тикеры).
+    """
+    n_days = prices.shape[0]
+    n_runs = grid.shape[0]
+    valued = np.nan_to_num(prices, nan=0.0)  # до начала истории тикера — цена 0, не торгуется
+    cash = np.full(n_runs, float(initial_wallet))
+    held = np.zeros((n_runs, prices.shape[1]), dtype=np.int64)
+    equity = np.empty((n_runs, n_days), dtype=np.float64)
+    traded = np.zeros(n_runs, dtype=np.float64)
+    trades = np.zeros(n_runs, dtype=np.int64)
+
+    for t in range(n_days):
+        if t >= first_day and (t - first_day) % rebalance_every == 0:
+            cash, held, sold, bought = rebalance_arrays(
+                cash, held, valued[t], confidence[t], grid[:, 0], grid[:, 1], grid[:, 2],
+            )
+            traded += (bought - sold) @ valued[t]
+            trades += np.count_nonzero(sold, axis=1) + np.count_nonzero(bought, axis=1)
+        equity[:, t] = cash + held @ valued[t]
+
+    return {"equity": equity, "traded": traded, "trades": trades, "holdings": held, "cash": cash}
+
+def _metrics(equity: np.ndarray, traded: np.ndarray, initial_wallet: float) -> Dict[str, np.ndarray]:
+    years = max(equity.shape[1] - 1, 1) / TRADING_DAYS
+    total = equity[:, -1] / initial_wallet - 1.0
+    daily = np.diff(equity, axis=1) / equity[:, :-1]
+    vol = daily.std(axis=1, ddof=1) if daily.shape[1] > 1 else np.zeros(equity.shape[0])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = np.where(vol > 0, daily.mean(axis=1) / vol, 0.0) * np.sqrt(TRADING_DAYS)
+    return {
+        "total_return": total,
+        "annual_return": np.power(np.maximum(1.0 + total, 0.0), 1.0 / years) - 1.0,
+        "volatility": vol * np.sqrt(TRADING_DAYS),
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdowns(equity, np.full(equity.shape[0], float(initial_wallet))),
+        "turnover": traded / equity.mean(axis=1) / years,  # годовой оборот в долях средней стоимости
+        "traded_value": traded,
+    }
+
+def run_backtest(
+    tickers: Optional[Sequence[str]] = None,
+    initial_wallet: float = 10_000.0,
+    start: Optional[np.datetime64] = None,
+    end: Optional[np.datetime64] = None,
+    signal: Literal["momentum", "static"] = "momentum",
+    confidences: Optional[Dict[str, float]] = None,
+    lookback: int = DEFAULT_LOOKBACK,
+    rebalance_every: int = 1,
+    max_company_share: Sequence[float] = (0.25,),
+    min_buy_confidence: Sequence[float] = (0.5,),
+    max_sell_confidence: Sequence[float] = (0.3,),
+    include_equity: bool = False,
+) -> Dict[str, Any]:
+    """
+    Бэктест правил generate_trades по истории FundData_*.csv.
+
+    Каждый rebalance_every-й торговый день кошелёк перебалансируется по ценам закрытия
+    и уверенности (signal: momentum — ранг доходности за lookback дней, static — фиксированные
+    confidences). Сетка порогов прогоняется одним проходом: все комбинации — строки одной матрицы.
+    """
+    if initial_wallet <= 0:
+        raise ValueError("initial_wallet must be > 0")
+    if rebalance_every < 1:
+        raise ValueError("rebalance_every must be >= 1")
+    if lookback < 1:
+        raise ValueError("lookback must be >= 1")
+    names = [t.upper().strip() for t in (tickers or fund_store.tickers())]
+    if not names:
+        raise ValueError("empty tickers")
+    grid = _param_grid(max_company_share, min_buy_confidence, max_sell_confidence)
+
+    dates, prices = load_price_panel(names, start, end)
+    if signal == "momentum":
+        if lookback >= dates.size:
+            raise ValueError("lookback must be shorter than the history ({} days)".format(dates.size))
+        confidence = momentum_confidence(prices, lookback)
+        first_day = lookback
+    else:
+        confidence = static_confidence(names, dates.size, confidences)
+        first_day = 0
+
+    run = replay(prices, confidence, initial_wallet, grid, first_day, rebalance_every)
+    stats = _metrics(run["equity"], run["traded"], initial_wallet)
+
+    results: List[Dict[str, Any]] = []
+    for i, (share, buy, sell) in enumerate(grid):
+        item: Dict[str, Any] = {
+            "max_company_share": float(share),
+            "min_buy_confidence": float(buy),
+            "max_sell_confidence": float(sell),
+            "final_value": float(run["equity"][i, -1]),
+            "final_cash": float(run["cash"][i]),
+            "trades": int(run["trades"][i]),
+        }
+        item.update({name: float(values[i]) for name, values in stats.items()})
+        item["final_holdings"] = {t: int(n) for t, n in zip(names, run["holdings"][i]) if n}
+        if include_equity:
+            item["equity"] = run["equity"][i].tolist()
+        results.append(item)
+
+    response: Dict[str, Any] = {
+        "tickers": names,
+        "signal": signal,
+        "from": str(dates[0]),
+        "to": str(dates[-1]),
+        "n_days": int(dates.size),
+        "initial_wallet": float(initial_wallet),
+        "best": int(np.argmax(stats["sharpe"])),
+        "results": results,
+    }
+    if include_equity:
+        response["dates"] = dates.astype(str).tolist()
+    return response
@@ -0,0 +1,66 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+import numpy as np
+from services.csv_data.fund_store import fund_store
+
+MIN_RETURNS = 30
+NU_MIN = 3  # nu > 2, иначе у t-распределения нет дисперсии
+NU_MAX = 200  # как le=200 у параметра nu в /simulate
+
+def _estimate(prices: np.ndarray) -> Dict[str, Any]:
+    """
+    Оценка параметров модели simulate_price_series по дневным лог-доходностям.
+
+    nu — методом моментов по эксцессу (excess kurtosis t-распределения = 6 / (nu - 4)).
+    sigma_daily масштабируется на sqrt((nu - 2) / nu): в модели шок = t(nu) * sigma,
+    а дисперсия t(nu) равна nu / (nu - 2), так что симулированная дневная
+    волатильность совпадает с исторической.
+    """
+    r = np.diff(np.log(prices))
+    r = r[np.isfinite(r)]
+    if r.size < MIN_RETURNS:
+        raise ValueError("not enough history to calibrate ({} returns)".format(r.size))
+
+    mu = float(r.mean())
+    std = float(r.std(ddof=1))
+    centered = r - mu
+    m2 = float(np.mean(centered ** 2))
+    excess_kurtosis = float(np.mean(centered ** 4)) / (m2 * m2) - 3.0 if m2 > 0 else 0.0
+
+    if excess_kurtosis > 0:
+        nu = int(round(min(NU_MAX, max(NU_MIN, 4.0 + 6.0 / excess_kurtosis))))
+    else:
+        nu = NU_MAX
+
+    return {
+        "mu_daily": mu,
+        "sigma_daily": std * float(np.sqrt((nu - 2) / nu)),
+        "nu": nu,
+        "n_returns": int(r.size),
+        "excess_kurtosis": excess_kurtosis,
+    }
+
+@lru_cache(maxsize=256)
+def _calibrate_cached(ticker: str, version: int) -> Dict[str, Any]:
+    # version (mtime файла) — часть ключа кэша: изменился CSV — пересчитываем
+    series = fund_store.get(ticker)
+    result = _estimate(np.asarray(series.prices, dtype=np.float64))
+    result["ticker"] = ticker
+    result["from"] = str(series.dates[0]) if series.count else None
+    result["to"] = str(series.dates[-1]) if series.count else None
+    return result
+
+def calibrate_ticker(ticker: str) -> Dict[str, Any]:
+    """
+    mu_daily / sigma_daily / nu для тикера по истории FundData_{TICKER}.csv.
+    Считается один раз на версию файла и кэшируется.
+    """
+    t_clean = ticker.upper().strip()
+    try:
+        version = fund_store.get(t_clean).mtime_ns
+    except FileNotFoundError:
+        raise ValueError("no fund data for symbol {}".format(t_clean))
+    return dict(_calibrate_cached(t_clean, version))
+
+def calibrate_many(tickers: Sequence[str]) -> List[Dict[str, Any]]:
+    return [calibrate_ticker(t) for t in tickers]
@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Sequence, Tuple
+import numpy as np
+from services.csv_data.fund_store import fund_store
+
+MIN_COMMON_RETURNS = 30  # минимум общих дневных доходностей для оценки корреляций
+_MIN_EIGENVALUE = 1e-8
+
+def _aligned_log_returns(tickers: Tuple[str, ...]) -> np.ndarray:
+    """
+    Дневные лог-доходности тикеров на общих датах, матрица (assets x days).
+    """
+    series = [fund_store.get(t) for t in tickers]
+
+    common = series[0].dates
+    for s in series[1:]:
+        common = np.intersect1d(common, s.dates, assume_unique=True)
+    if common.size < MIN_COMMON_RETURNS + 1:
+        raise ValueError("not enough common history to correlate {}".format(", ".join(tickers)))
+
+    prices = np.vstack([s.prices[np.searchsorted(s.dates, common)] for s in series])
+    return np.diff(np.log(prices), axis=1)
+
+def _nearest_correlation(corr: np.ndarray) -> np.ndarray:
+    """
+    Обрезает отрицательные/нулевые собственные значения и возвращает единицы на диагональ,
+    чтобы Холецкий не падал на вырожденных матрицах (например, повторяющийся тикер).
+    """
+    w, v = np.linalg.eigh(corr)
+    w = np.clip(w, _MIN_EIGENVALUE, None)
+    fixed = (v * w) @ v.T
+    d = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(d, d)
+
+@lru_cache(maxsize=64)
+def _returns_cached(tickers: Tuple[str, ...], versions: Tuple[int, ...]) -> np.ndarray:
+    returns = _aligned_log_returns(tickers)
+    returns.setflags(write=False)
+    return returns
+
+@lru_cache(maxsize=64)
+def _residuals_cached(tickers: Tuple[str, ...], versions: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    returns = _returns_cached(tickers, versions)
+    mean = returns.mean(axis=1)
+    residuals = returns - mean[:, None]
+    mean.setflags(write=False)
+    residuals.setflags(write=False)
+    return mean, residuals
+
+@lru_cache(maxsize=64)
+def _cholesky_cached(tickers: Tuple[str, ...], versions: Tuple[int, ...]) -> np.ndarray:
+    # versions (mtime файлов) — только часть ключа кэша: изменился CSV — пересчитываем
+    if len(tickers) == 1:
+        return np.ones((1, 1), dtype=np.float64)
+    returns = _returns_cached(tickers, versions)
+    corr = np.corrcoef(returns)
+    try:
+        chol = np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        chol = np.linalg.cholesky(_nearest_correlation(corr))
+    chol.setflags(write=False)
+    return chol
+
+def _cache_key(tickers: Sequence[str]) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+    key = tuple(t.upper().strip() for t in tickers)
+    if not key:
+        raise ValueError("empty tickers")
+    try:
+        versions = tuple(fund_store.get(t).mtime_ns for t in key)
+    except FileNotFoundError as e:
+        raise ValueError("no fund data for symbol: {}".format(e))
+    return key, versions
+
+def get_historical_returns(tickers: Sequence[str]) -> np.ndarray:
+    """
+    Дневные лог-доходности тикеров на общих датах (assets x days), только для чтения.
+    Общие даты сохраняют совместное движение активов — нужно для bootstrap.
+    """
+    return _returns_cached(*_cache_key(tickers))
+
+def get_historical_residuals(tickers: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (средняя дневная лог-доходность по активу, отклонения от неё (assets x days)) — только для чтения.
+    Один экземпляр на набор тикеров: сессии bootstrap делят его, а не держат свои копии.
+    """
+    return _residuals_cached(*_cache_key(tickers))
+
+def get_cholesky_factor(tickers: Sequence[str]) -> np.ndarray:
+    """
+    Фактор Холецкого L корреляционной матрицы дневных лог-доходностей из FundData_*.csv.
+
+    Корреляция (а не ковариация) — масштаб каждого актива задаёт sigma_daily из конфига,
+    поэтому L @ eps коррелирует шоки, не меняя их дисперсию.
+    Считается один раз на набор тикеров (и версию файлов) и кэшируется.
+    """
+    return _cholesky_cached(*_cache_key(tickers))
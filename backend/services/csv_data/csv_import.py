@@ -1,6 +1,10 @@
 import csv
+import os
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+
+TAIL_BLOCK_SIZE = 4096
+TAIL_MAX_LINES = 64
 
 def load_fund_data(ticker: str, data_dir: Optional[Path] = None) -> Dict[str, any]:
     t_clean = ticker.upper().strip()
@@ -82,7 +86,84 @@ def load_fund_data(ticker: str, data_dir: Optional[Path] = None) -> Dict[str, an
         "source_file": str(file_path),
     }
 
+def _guess_value_idx(header: List[str], sample_rows: List[List[str]]) -> int:
+    date_idx = None
+    for i, name in enumerate(header):
+        if "date" in name.lower():
+            date_idx = i
+            break
+    if date_idx is None:
+        date_idx = 0
+
+    for i, name in enumerate(header):
+        if i == date_idx:
+            continue
+        for r in sample_rows[:5]:
+            if i < len(r):
+                try:
+                    float((r[i] or "").replace(",", ""))
+                    return i
+                except Exception:
+                    pass
+    return 1 if len(header) > 1 else date_idx
+
+def _read_head_and_tail(file_path: Path, max_lines: int) -> Tuple[str, List[str]]:
+    """
+    Читает первые 2 КБ файла и не больше max_lines последних строк, двигаясь блоками с конца.
+    """
+    with file_path.open("rb") as f:
+        head = f.read(2048)
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        tail = b""
+        while pos > 0 and tail.count(b"\n") <= max_lines:
+            size = min(TAIL_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            tail = f.read(size) + tail
+
+    lines = tail.decode("utf-8-sig", errors="replace").splitlines()
+    if pos > 0:
+        lines = lines[1:]  # первая строка блока может быть обрезана
+    return head.decode("utf-8-sig", errors="replace"), lines[-max_lines:]
+
+def _latest_value_from_tail(file_path: Path) -> Optional[float]:
+    """
+    Последнее числовое значение по хвосту файла. None — если в хвосте его нет
+    (тогда нужен полный проход).
+    """
+    head, tail_lines = _read_head_and_tail(file_path, TAIL_MAX_LINES)
+    if head.lower().startswith("dates,price"):
+        dialect = csv.excel  # стандартный формат — Sniffer не нужен
+    else:
+        try:
+            dialect = csv.Sniffer().sniff(head)
+        except Exception:
+            dialect = csv.excel
+
+    head_rows = list(csv.reader(head.splitlines(), dialect))
+    if not head_rows:
+        return None
+    header = [h.strip() for h in head_rows[0]]
+    value_idx = _guess_value_idx(header, head_rows[1:6])
+
+    for r in reversed(list(csv.reader(tail_lines, dialect))):
+        if len(r) <= value_idx:
+            continue
+        raw = (r[value_idx] or "").strip()
+        if not raw:
+            continue
+        try:
+            return float(raw.replace(",", ""))
+        except Exception:
+            continue
+    return None
+
 def load_latest_value(ticker: str, data_dir: Optional[Path] = None) -> Optional[float]:
+    """
+    Последнее числовое значение из FundData_{TICKER}.csv.
+    Читается только заголовок и хвост файла; полный проход — лишь если в хвосте нет чисел.
+    """
     t_clean = ticker.upper().strip()
     if data_dir is None:
         data_dir = Path(__file__).parent.parent.parent / "data"
@@ -90,6 +171,12 @@ def load_latest_value(ticker: str, data_dir: Optional[Path] = None) -> Optional[
     if not file_path.exists():
         raise FileNotFoundError(f"CSV not found: {file_path}")
 
+    latest = _latest_value_from_tail(file_path)
+    if latest is not None:
+        return latest
+    return _load_latest_value_full(file_path)
+
+def _load_latest_value_full(file_path: Path) -> Optional[float]:
     with file_path.open("r", encoding="utf-8-sig") as f:
         sample = f.read(2048)
         f.seek(0)
@@ -105,31 +192,7 @@ def load_latest_value(ticker: str, data_dir: Optional[Path] = None) -> Optional[
 
     header = [h.strip() for h in rows[0]]
     data_rows = rows[1:]
-
-    date_idx = None
-    for i, name in enumerate(header):
-        if "date" in name.lower():
-            date_idx = i
-            break
-    if date_idx is None:
-        date_idx = 0
-
-    value_idx = None
-    for i, name in enumerate(header):
-        if i == date_idx:
-            continue
-        for r in data_rows[:5]:
-            if i < len(r):
-                try:
-                    float((r[i] or "").replace(",", ""))
-                    value_idx = i
-                    break
-                except Exception:
-                    pass
-        if value_idx is not None:
-            break
-    if value_idx is None:
-        value_idx = 1 if len(header) > 1 else date_idx
+    value_idx = _guess_value_idx(header, data_rows)
 
     last_value: Optional[float] = None
     for r in data_rows:
@@ -0,0 +1,114 @@
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+import numpy as np
+
+def slice_range(
+    dates: np.ndarray,
+    prices: np.ndarray,
+    start: Optional[np.datetime64] = None,
+    end: Optional[np.datetime64] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Окно [start, end] (включительно) по отсортированным датам — бинарный поиск, без копий.
+    """
+    lo = 0 if start is None else int(np.searchsorted(dates, start, side="left"))
+    hi = dates.size if end is None else int(np.searchsorted(dates, end, side="right"))
+    return dates[lo:hi], prices[lo:hi]
+
+def align_panel(
+    dates_list: Sequence[np.ndarray],
+    prices_list: Sequence[np.ndarray],
+    join: Literal["outer", "inner"] = "outer",
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Выравнивает несколько рядов на общий индекс дат.
+    outer — объединение дат, пропуски заполняются NaN; inner — только общие даты.
+    """
+    if not dates_list:
+        return np.empty(0, dtype="datetime64[D]"), []
+    if join == "inner":
+        index = dates_list[0]
+        for d in dates_list[1:]:
+            index = np.intersect1d(index, d, assume_unique=True)
+        columns = [p[np.searchsorted(d, index)] for d, p in zip(dates_list, prices_list)]
+        return index, columns
+
+    index = np.unique(np.concatenate(dates_list))
+    columns = []
+    for d, p in zip(dates_list, prices_list):
+        col = np.full(index.size, np.nan)
+        col[np.searchsorted(index, d)] = p
+        columns.append(col)
+    return index, columns
+
+def every_nth(dates: np.ndarray, prices: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Каждая n-я точка; последняя точка окна сохраняется всегда.
+    """
+    if n <= 1 or dates.size <= 1:
+        return dates, prices
+    idx = np.arange(0, dates.size, n)
+    if idx[-1] != dates.size - 1:
+        idx = np.append(idx, dates.size - 1)
+    return dates[idx], prices[idx]
+
+def ohlc_buckets(
+    dates: np.ndarray,
+    prices: np.ndarray,
+    freq: Literal["weekly", "monthly"],
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    OHLC по неделям (с понедельника) или календарным месяцам.
+    Дата бакета — первый торговый день в нём.
+    """
+    if dates.size == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return dates, {"open": empty, "high": empty, "low": empty, "close": empty}
+
+    days = dates.astype("datetime64[D]").astype(np.int64)
+    if freq == "weekly":
+        keys = (days + 3) // 7  # 1970-01-01 — четверг, сдвиг выравнивает недели на понедельник
+    else:
+        keys = dates.astype("datetime64[M]").astype(np.int64)
+
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.append(starts[1:], dates.size) - 1
+    return dates[starts], {
+        "open": prices[starts],
+        "high": np.maximum.reduceat(prices, starts),
+        "low": np.minimum.reduceat(prices, starts),
+        "close": prices[ends],
+    }
+
+def lttb(dates: np.ndarray, prices: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets: прореживание до threshold точек с сохранением формы графика.
+    Первая и последняя точки остаются; из каждого бакета берётся точка с наибольшей
+    площадью треугольника с предыдущей выбранной точкой и средним следующего бакета.
+    """
+    n = dates.size
+    if threshold >= n or threshold < 3:
+        return dates, prices
+
+    x = dates.astype("datetime64[D]").astype(np.float64)
+    y = prices
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)  # границы threshold-2 бакетов
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], edges[i + 2]
+        else:
+            nlo, nhi = n - 1, n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return dates[selected], prices[selected]
@@ -0,0 +1,194 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from services.csv_data.csv_import import load_latest_value
+from services.csv_data.ingest import DEFAULT_DATA_DIR, read_fund_arrays
+
+LOAD_WORKERS = 8  # потоки для параллельной загрузки нескольких файлов
+
+@dataclass
+class FundSeries:
+    """
+    История одного тикера в колоночном виде: отсортированные даты и цены.
+    """
+    ticker: str
+    dates: np.ndarray  # datetime64[D], по возрастанию
+    prices: np.ndarray  # float64
+    source_file: str
+    mtime_ns: int
+    _json: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def count(self) -> int:
+        return int(self.prices.size)
+
+    def as_dict(self) -> Dict[str, object]:
+        """
+        Тот же формат, что у load_fund_data: {"ticker", "data": {date: price}, "count", "source_file"}.
+        """
+        labels = np.datetime_as_string(self.dates, unit="D").tolist()
+        return {
+            "ticker": self.ticker,
+            "data": dict(zip(labels, self.prices.tolist())),
+            "count": self.count,
+            "source_file": self.source_file,
+        }
+
+    def as_json(self) -> bytes:
+        """
+        Готовый JSON-ответ для /fund/{ticker}, собирается один раз на версию файла.
+        """
+        if self._json is None:
+            self._json = json.dumps(self.as_dict()).encode("utf-8")
+        return self._json
+
+class FundDataStore:
+    """
+    Кэш FundData_*.csv в памяти: каждый файл парсится один раз (лениво или через preload)
+    и перечитывается только если изменился mtime.
+    """
+
+    def __init__(self, data_dir: Optional[Path] = None):
+        self.data_dir = Path(data_dir) if data_dir is not None else DEFAULT_DATA_DIR
+        self._series: Dict[str, FundSeries] = {}
+        self._lock = threading.Lock()  # только для словаря _locks
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        # свой замок на тикер: разные файлы парсятся параллельно, один и тот же — один раз
+        with self._lock:
+            lock = self._locks.get(ticker)
+            if lock is None:
+                lock = self._locks[ticker] = threading.Lock()
+            return lock
+
+    def _path(self, ticker: str) -> Path:
+        return self.data_dir / f"FundData_{ticker}.csv"
+
+    def _load(self, ticker: str, file_path: Path, mtime_ns: int) -> FundSeries:
+        dates, prices = read_fund_arrays(ticker, self.data_dir)
+        return FundSeries(
+            ticker=ticker,
+            dates=dates,
+            prices=prices,
+            source_file=str(file_path),
+            mtime_ns=mtime_ns,
+        )
+
+    def get(self, ticker: str) -> FundSeries:
+        t_clean = ticker.upper().strip()
+        file_path = self._path(t_clean)
+        try:
+            mtime_ns = file_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._series.pop(t_clean, None)
+            raise FileNotFoundError(f"CSV not found: {file_path}")
+
+        series = self._series.get(t_clean)
+        if series is not None and series.mtime_ns == mtime_ns:
+            return series
+
+        with self._ticker_lock(t_clean):
+            series = self._series.get(t_clean)
+            if series is None or series.mtime_ns != mtime_ns:
+                series = self._load(t_clean, file_path, mtime_ns)
+                self._series[t_clean] = series
+        return series
+
+    def _is_fresh(self, ticker: str) -> bool:
+        series = self._series.get(ticker)
+        if series is None:
+            return False
+        try:
+            return series.mtime_ns == self._path(ticker).stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def get_many(self, tickers: List[str]) -> Tuple[List[FundSeries], List[str]]:
+        """
+        Ряды нескольких тикеров: ([FundSeries в порядке запроса], [отсутствующие тикеры]).
+        Незагруженные или устаревшие файлы парсятся параллельно в пуле потоков.
+        Файлы, которые не удалось разобрать, тоже попадают в missing.
+        """
+        names = [t.upper().strip() for t in tickers]
+        cold = sorted({t for t in names if not self._is_fresh(t)})
+        if len(cold) > 1:
+            with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(cold))) as pool:
+                # отсутствующие файлы попадут в missing ниже
+                list(pool.map(self._try_get, cold))
+
+        found: List[FundSeries] = []
+        missing: List[str] = []
+        for t in names:
+            try:
+                found.append(self.get(t))
+            except FileNotFoundError:
+                missing.append(t)
+            except ValueError as e:
+                print(f"[fund_store] {t}: {e}")
+                missing.append(t)
+        return found, missing
+
+    def _try_get(self, ticker: str) -> Optional[FundSeries]:
+        try:
+            return self.get(ticker)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def latest(self, ticker: str) -> Optional[float]:
+        """
+        Последняя цена: из загруженного ряда за O(1), иначе — чтением хвоста файла,
+        без полной загрузки.
+        """
+        t_clean = ticker.upper().strip()
+        file_path = self._path(t_clean)
+        try:
+            mtime_ns = file_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._series.pop(t_clean, None)
+            raise FileNotFoundError(f"CSV not found: {file_path}")
+
+        series = self._series.get(t_clean)
+        if series is None or series.mtime_ns != mtime_ns:
+            return load_latest_value(t_clean, self.data_dir)
+        if series.count == 0:
+            return None
+        return float(series.prices[-1])
+
+    def latest_many(self, tickers: List[str]) -> Tuple[Dict[str, Optional[float]], List[str]]:
+        """
+        Последние цены пачки тикеров: ({ticker: value}, [отсутствующие тикеры]).
+        """
+        values: Dict[str, Optional[float]] = {}
+        missing: List[str] = []
+        for t in tickers:
+            t_clean = t.upper().strip()
+            try:
+                values[t_clean] = self.latest(t_clean)
+            except FileNotFoundError:
+                missing.append(t_clean)
+        return values, missing
+
+    def tickers(self) -> List[str]:
+        return sorted(p.stem[len("FundData_"):] for p in self.data_dir.glob("FundData_*.csv"))
+
+    def preload(self) -> int:
+        """
+        Загружает все FundData_*.csv из data_dir, возвращает количество тикеров.
+        Неразборчивый файл не валит старт: пишется в лог и пропускается.
+        """
+        loaded = 0
+        for ticker in self.tickers():
+            try:
+                self.get(ticker)
+            except ValueError as e:
+                print(f"[fund_store] skipping {ticker}: {e}")
+                continue
+            loaded += 1
+        return loaded
+
+fund_store = FundDataStore()
@@ -0,0 +1,121 @@
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from services.csv_data.csv_import import load_fund_data
+from services.csv_data.npy_cache import cache_dir_for, load_cached, write_cache
+
+DEFAULT_DATA_DIR = Path(__file__).parent.parent.parent / "data"
+KNOWN_HEADER = ("dates", "price")
+_ROW_DTYPE = np.dtype([("date", "datetime64[D]"), ("price", np.float64)])
+# форматы дат, кроме ISO, которые встречаются в выгрузках; первый подошедший ко всем строкам
+DATE_FORMATS = ("%d.%m.%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%Y.%m.%d", "%Y%m%d")
+
+def _parse_known_layout(file_path: Path) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Быстрый путь для стандартного формата "Dates,Price" с датами YYYY-MM-DD:
+    весь файл разбирается одним вызовом np.loadtxt (C-парсер).
+    None — если формат другой или данные нестрогие (пропуски, дубли, не по порядку).
+    """
+    with file_path.open("r", encoding="utf-8-sig") as f:
+        header = tuple(h.strip().lower() for h in f.readline().split(","))
+        if header != KNOWN_HEADER:
+            return None
+        try:
+            rows = np.loadtxt(f, delimiter=",", dtype=_ROW_DTYPE, ndmin=1)
+        except ValueError:
+            return None
+
+    dates = rows["date"]
+    if dates.size > 1 and not np.all(dates[1:] > dates[:-1]):
+        return None
+    return dates, rows["price"]
+
+def parse_dates(labels: List[str]) -> np.ndarray:
+    """
+    Строки дат -> datetime64[D]: сначала ISO (векторно), затем DATE_FORMATS через strptime.
+    ValueError — если ни один формат не подходит ко всем строкам.
+    """
+    try:
+        return np.array(labels, dtype="datetime64[D]")
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return np.array([datetime.strptime(d, fmt).date() for d in labels], dtype="datetime64[D]")
+        except ValueError:
+            continue
+    sample = labels[0] if labels else ""
+    raise ValueError(f"unrecognised date format: {sample!r}")
+
+def _parse_generic(ticker: str, data_dir: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Запасной путь для любых других раскладок — прежний csv.Sniffer-парсер.
+    """
+    result = load_fund_data(ticker, data_dir)
+    data = result["data"]
+    try:
+        dates = parse_dates(list(data))
+    except ValueError as e:
+        raise ValueError(f"{result['source_file']}: {e}") from None
+    prices = np.fromiter(data.values(), dtype=np.float64, count=len(data))
+    order = np.argsort(dates, kind="stable")
+    return dates[order], prices[order]
+
+def read_fund_arrays(
+    ticker: str,
+    data_dir: Path,
+    use_cache: bool = True,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Даты (datetime64[D], по возрастанию) и цены (float64) из FundData_{TICKER}.csv.
+    С use_cache сначала пробует mmap .npy-кэш (см. npy_cache), а после парсинга
+    CSV обновляет его, чтобы следующие процессы вообще не парсили CSV.
+    """
+    t_clean = ticker.upper().strip()
+    data_dir = Path(data_dir)
+    file_path = data_dir / f"FundData_{t_clean}.csv"
+    if not file_path.exists():
+        raise FileNotFoundError(f"CSV not found: {file_path}")
+
+    cache_dir = cache_dir_for(data_dir)
+    if use_cache:
+        cached = load_cached(file_path, cache_dir)
+        if cached is not None:
+            return cached
+
+    parsed = _parse_known_layout(file_path)
+    if parsed is None:
+        parsed = _parse_generic(t_clean, data_dir)
+
+    if use_cache:
+        try:
+            write_cache(file_path, cache_dir, *parsed)
+        except OSError:
+            pass  # кэш — оптимизация; read-only диск не должен ломать загрузку
+    return parsed
+
+if __name__ == "__main__":
+    # Бенчмарк: python -m services.csv_data.ingest
+    import time
+
+    data_dir = DEFAULT_DATA_DIR
+    files = sorted(data_dir.glob("FundData_*.csv"))
+    totals = [0.0, 0.0, 0.0]
+    print(f"{'ticker':<8}{'rows':>7}{'csv.Sniffer, ms':>18}{'loadtxt, ms':>14}{'npy mmap, ms':>15}")
+    for p in files:
+        ticker = p.stem[len("FundData_"):]
+        read_fund_arrays(ticker, data_dir)  # прогрев .npy-кэша
+        t0 = time.perf_counter()
+        old = load_fund_data(ticker, data_dir)
+        t1 = time.perf_counter()
+        dates, prices = read_fund_arrays(ticker, data_dir, use_cache=False)
+        t2 = time.perf_counter()
+        _, cached_prices = read_fund_arrays(ticker, data_dir)
+        t3 = time.perf_counter()
+        assert np.array_equal(prices, np.fromiter(old["data"].values(), dtype=np.float64))
+        assert np.array_equal(prices, cached_prices)
+        times = (t1 - t0, t2 - t1, t3 - t2)
+        totals = [a + b for a, b in zip(totals, times)]
+        print(f"{ticker:<8}{prices.size:>7}" + "".join(f"{t * 1e3:>{w}.2f}" for t, w in zip(times, (18, 14, 15))))
+    print(f"{'all':<8}{len(files):>7}" + "".join(f"{t * 1e3:>{w}.2f}" for t, w in zip(totals, (18, 14, 15))))
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+import numpy as np
+
+CACHE_DIR_NAME = "data_cache"  # рядом с data/: backend/data_cache/
+
+def cache_dir_for(data_dir: Path) -> Path:
+    return Path(data_dir).parent / CACHE_DIR_NAME
+
+def _paths(cache_dir: Path, stem: str) -> Tuple[Path, Path, Path]:
+    return (
+        cache_dir / f"{stem}.dates.npy",
+        cache_dir / f"{stem}.prices.npy",
+        cache_dir / f"{stem}.meta.json",
+    )
+
+def _file_sha256(file_path: Path) -> str:
+    return hashlib.sha256(file_path.read_bytes()).hexdigest()
+
+def _atomic_write(path: Path, write) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+def load_cached(file_path: Path, cache_dir: Path) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Даты/цены из .npy-кэша через mmap (без парсинга CSV).
+    Кэш валиден, если совпадают mtime и размер исходника, либо (после touch/checkout) его sha256.
+    None — кэша нет или он устарел.
+    """
+    dates_path, prices_path, meta_path = _paths(cache_dir, file_path.stem)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        st = file_path.stat()
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("mtime_ns") != st.st_mtime_ns or meta.get("size") != st.st_size:
+        if meta.get("size") != st.st_size or meta.get("sha256") != _file_sha256(file_path):
+            return None
+        meta["mtime_ns"] = st.st_mtime_ns
+        try:
+            _atomic_write(meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+        except OSError:
+            pass
+
+    try:
+        days = np.load(dates_path, mmap_mode="r")
+        prices = np.load(prices_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if days.shape != prices.shape:
+        return None
+    return days.view("datetime64[D]"), prices
+
+def write_cache(file_path: Path, cache_dir: Path, dates: np.ndarray, prices: np.ndarray) -> None:
+    """
+    Сохраняет даты (int64, дни от 1970-01-01) и цены (float64) в .npy + meta.json.
+    meta пишется последним — до этого момента кэш считается отсутствующим.
+    """
+    dates_path, prices_path, meta_path = _paths(cache_dir, file_path.stem)
+    st = file_path.stat()
+    meta = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": _file_sha256(file_path)}
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    days = np.ascontiguousarray(dates.astype("datetime64[D]").astype(np.int64))
+    _atomic_write(dates_path, lambda f: np.save(f, days))
+    _atomic_write(prices_path, lambda f: np.save(f, np.ascontiguousarray(prices, dtype=np.float64)))
+    _atomic_write(meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+if __name__ == "__main__":
+    # Сборка кэша для всех файлов: python -m services.csv_data.npy_cache
+    from services.csv_data.ingest import DEFAULT_DATA_DIR, read_fund_arrays
+
+    built = 0
+    for p in sorted(DEFAULT_DATA_DIR.glob("FundData_*.csv")):
+        read_fund_arrays(p.stem[len("FundData_"):], DEFAULT_DATA_DIR)
+        built += 1
+    print(f"npy cache ready for {built} files in {cache_dir_for(DEFAULT_DATA_DIR)}")
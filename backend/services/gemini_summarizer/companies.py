@@ -0,0 +1,56 @@
+# companies.py
+from typing import Dict, List, Optional
+
+from services.csv_data.fund_store import fund_store
+from services.gemini_summarizer.trade import Company
+
+# Справочник тикеров
+TICKER_COMPANIES: Dict[str, str] = {
+    "MSFT": "Microsoft",
+    "AAPL": "Apple",
+    "KO": "Coca-Cola",
+    "WMT": "Walmart",
+    "PEP": "PepsiCo",
+    "JNJ": "Johnson & Johnson",
+    "V": "Visa",
+    "JPM": "JPMorgan",
+    "UNH": "UnitedHealth",
+    "XOM": "Exxon Mobil",
+    "AMZN": "Amazon",
+    "GOOGL": "Alphabet",
+    "META": "Meta Platforms",
+    "COST": "Costco",
+    "DIS": "Disney",
+    "INTC": "Intel",
+    "CSCO": "Cisco",
+    "BA": "Boeing",
+    "GE": "General Electric",
+    "NKE": "Nike",
+    "TSLA": "Tesla",
+    "NVDA": "NVIDIA",
+    "AMD": "AMD",
+    "PLTR": "Palantir",
+    "SHOP": "Shopify",
+    "SOFI": "SoFi",
+    "HOOD": "Robinhood",
+    "RBLX": "Roblox",
+    "COIN": "Coinbase",
+    "RIOT": "Riot Platforms",
+}
+
+
+def live_companies(tickers: Optional[List[str]] = None) -> List[Company]:
+    """
+    Компании с последней ценой из FundData_*.csv (fund_store держит ряды в памяти).
+    По умолчанию — все тикеры с данными, в порядке справочника; тикеры без цены пропускаются.
+    """
+    if tickers is None:
+        available = set(fund_store.tickers())
+        tickers = [t for t in TICKER_COMPANIES if t in available]
+        tickers += sorted(available - set(tickers))
+    values, _missing = fund_store.latest_many(tickers)
+    return [
+        Company(ticker, TICKER_COMPANIES.get(ticker, ticker), float(price))
+        for ticker, price in values.items()
+        if price is not None and price > 0
+    ]
@@ -1,9 +1,24 @@
 # confidence_updater_firebase.py
-from typing import Dict
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from firebase_admin import firestore
 
 from services.gemini_summarizer.firebase_config import get_firestore_client
 
 COLLECTION_NAME = "comp"
+SNAPSHOT_TTL_SECONDS = 30.0
+
+
+def _parse_confidence(data: Optional[Dict[str, Any]]) -> Optional[float]:
+    conf = (data or {}).get("confidence")
+    if conf is None:
+        return None
+    try:
+        return float(conf)
+    except (TypeError, ValueError):
+        return None
 
 
 def get_all_confidences() -> Dict[str, float]:
@@ -16,17 +31,128 @@ def get_all_confidences() -> Dict[str, float]:
 
     result: Dict[str, float] = {}
     for doc in docs:
-        data = doc.to_dict() or {}
-        conf = data.get("confidence")
-        if conf is None:
-            continue
-        try:
-            result[doc.id] = float(conf)
-        except (TypeError, ValueError):
-            continue
+        conf = _parse_confidence(doc.to_dict())
+        if conf is not None:
+            result[doc.id] = conf
     return result
 
 
+class ConfidenceCache:
+    """
+    Копия коллекции 'comp' в памяти процесса — только для чтения (снимки, торговля).
+
+    С запущенным слушателем (start_listener) Firestore сам присылает изменения
+    через on_snapshot, и чтения вообще не ходят в сеть. Без слушателя — TTL:
+    коллекция перечитывается не чаще раза в ttl секунд. Свои записи (уже
+    закоммиченные в Firestore) кладутся в память через remember.
+    """
+
+    def __init__(self, ttl: float = SNAPSHOT_TTL_SECONDS):
+        self.ttl = ttl
+        self._values: Optional[Dict[str, float]] = None
+        self._loaded_at = 0.0
+        # ticker -> (confidence, когда записали): чтобы перечитывание, начатое
+        # до записи, не затёрло её старым значением
+        self._written: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._watch = None
+        self._synced = threading.Event()
+
+    def _on_snapshot(self, col_snapshot, changes, read_time) -> None:
+        # col_snapshot — все документы коллекции на read_time (Firestore держит их у себя,
+        # по сети приходят только изменения), поэтому просто пересобираем словарь
+        values: Dict[str, float] = {}
+        for doc in col_snapshot:
+            conf = _parse_confidence(doc.to_dict())
+            if conf is not None:
+                values[doc.id] = conf
+        with self._lock:
+            self._values = values
+            self._loaded_at = time.monotonic()
+            self._written.clear()
+        self._synced.set()
+
+    def start_listener(self, timeout: float = 10.0) -> bool:
+        """
+        Подписывается на изменения коллекции; ждёт первый снимок не дольше timeout секунд.
+        Возвращает False, если слушатель не поднялся (тогда работает TTL).
+        """
+        if self._watch is not None:
+            return True
+        try:
+            db = get_firestore_client()
+            self._watch = db.collection(COLLECTION_NAME).on_snapshot(self._on_snapshot)
+        except Exception as e:
+            print(f"[confidences] on_snapshot unavailable, falling back to TTL: {e}")
+            return False
+        return self._synced.wait(timeout)
+
+    def stop_listener(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+            self._synced.clear()
+
+    def _fresh(self) -> bool:
+        if self._watch is not None and self._synced.is_set():
+            return True
+        return self._values is not None and time.monotonic() - self._loaded_at <= self.ttl
+
+    def get_all(self) -> Dict[str, float]:
+        with self._lock:
+            if self._fresh():
+                return dict(self._values)
+        # сеть — без блокировки: остальные читатели тем временем получают старый снимок
+        started = time.monotonic()
+        values = get_all_confidences()
+        with self._lock:
+            if self._loaded_at > started:  # слушатель или другой поток успели раньше
+                return dict(self._values)
+            for ticker, (conf, at) in self._written.items():
+                if at >= started:
+                    values[ticker] = conf
+            self._written = {t: w for t, w in self._written.items() if w[1] >= started}
+            self._values = values
+            self._loaded_at = time.monotonic()
+            return dict(values)
+
+    def remember(self, values: Dict[str, float]) -> None:
+        """
+        Кладёт в память значения, уже записанные в Firestore.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for ticker, conf in values.items():
+                self._written[ticker] = (conf, now)
+            if self._values is not None:
+                self._values.update(values)
+
+
+confidence_cache = ConfidenceCache()
+
+
+def get_confidence_snapshot() -> Dict[str, float]:
+    """
+    {ticker: confidence} из памяти процесса (см. ConfidenceCache).
+    """
+    return confidence_cache.get_all()
+
+
+def _blend_confidence(
+    old_conf: float,
+    impact_score: float,
+    mix_base_weight: float,
+    mix_impact_weight: float,
+) -> float:
+    # Нормализуем impact
+    impact_clamped = max(-10.0, min(10.0, float(impact_score)))
+    impact_norm = (impact_clamped + 10.0) / 20.0  # -10..10 -> 0..1
+
+    # Смешиваем старую уверенность и влияние новости
+    new_conf = mix_base_weight * old_conf + mix_impact_weight * impact_norm
+    return max(0.0, min(1.0, new_conf))
+
+
 def apply_news_impact_firebase(
     impact_ratings: Dict[str, float],
     base_default: float = 0.5,
@@ -42,32 +168,33 @@ def apply_news_impact_firebase(
     Формула:
         impact_norm = (impact_score + 10) / 20  → [-10..10] -> [0..1]
         new_conf = mix_base_weight * old_conf + mix_impact_weight * impact_norm
+
+    Чтение старых значений и запись — одна транзакция Firestore только по затронутым
+    документам: если другой воркер успел их изменить, транзакция перезапускается
+    на свежих значениях, а не затирает их смесью со старым снимком.
     """
+    if not impact_ratings:
+        return {}
     db = get_firestore_client()
     coll_ref = db.collection(COLLECTION_NAME)
-
-    # Текущие значения confidence из Firestore
-    existing = get_all_confidences()
-
-    updated: Dict[str, float] = {}
-    batch = db.batch()
-
-    for ticker, impact_score in impact_ratings.items():
-        # Старое значение (если тикер впервые встречается – base_default)
-        old_conf = float(existing.get(ticker, base_default))
-
-        # Нормализуем impact
-        impact_clamped = max(-10.0, min(10.0, float(impact_score)))
-        impact_norm = (impact_clamped + 10.0) / 20.0  # -10..10 -> 0..1
-
-        # Смешиваем старую уверенность и влияние новости
-        new_conf = mix_base_weight * old_conf + mix_impact_weight * impact_norm
-        new_conf = max(0.0, min(1.0, new_conf))
-
-        updated[ticker] = new_conf
-
-        doc_ref = coll_ref.document(ticker)
-        batch.set(doc_ref, {"confidence": new_conf}, merge=True)
-
-    batch.commit()
+    refs = {ticker: coll_ref.document(ticker) for ticker in impact_ratings}
+
+    @firestore.transactional
+    def update(transaction) -> Dict[str, float]:
+        existing: Dict[str, float] = {}
+        for snap in transaction.get_all(list(refs.values())):
+            conf = _parse_confidence(snap.to_dict()) if snap.exists else None
+            if conf is not None:
+                existing[snap.id] = conf
+
+        updated: Dict[str, float] = {}
+        for ticker, impact_score in impact_ratings.items():
+            # Старое значение (если тикер впервые встречается – base_default)
+            old_conf = float(existing.get(ticker, base_default))
+            updated[ticker] = _blend_confidence(old_conf, impact_score, mix_base_weight, mix_impact_weight)
+            transaction.set(refs[ticker], {"confidence": updated[ticker]}, merge=True)
+        return updated
+
+    updated = update(db.transaction())
+    confidence_cache.remember(updated)
     return updated
@@ -1,5 +1,6 @@
 # config.py
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from google import genai
 from dotenv import load_dotenv
@@ -8,6 +9,12 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(env_path)
 
+GEMINI_MODEL = "gemini-2.5-flash-lite"
+
+# одновременных вызовов Gemini на процесс: /news и batch-роуты делят этот пул
+MODEL_CONCURRENCY = int(os.environ.get("GEMINI_CONCURRENCY", "4"))
+model_pool = ThreadPoolExecutor(max_workers=MODEL_CONCURRENCY, thread_name_prefix="gemini")
+
 
 def get_gemini_client() -> genai.Client:
     api_key = os.environ.get("GOOGLE_API_KEY")
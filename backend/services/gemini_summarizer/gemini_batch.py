@@ -0,0 +1,241 @@
+# gemini_batch.py
+import json
+import re
+import time
+from concurrent.futures import wait
+from typing import Any, Dict, List, Optional
+
+from services.gemini_summarizer.config import GEMINI_MODEL, model_pool
+from services.gemini_summarizer.gemini_predict import (
+    ANALYSIS_RULES,
+    _clamp_score,
+    _client,
+    analysis_cache_key,
+    analyze_article,
+)
+from services.gemini_summarizer.gemini_summarizer import summary_length_hint
+from services.gemini_summarizer.llm_cache import llm_cache
+
+BATCH_TOKEN_BUDGET = 8000  # входных токенов статей на один запрос к модели
+BATCH_MAX_ITEMS = 20  # статей на запрос: ограничивает и размер ответа
+MAX_ROUNDS = 3  # запросов с недостающими индексами до фолбэка на analyze_article
+BATCH_DEADLINE_SECONDS = 60.0  # общий дедлайн analyze_articles; что не успело — ответ-ошибка
+CHARS_PER_TOKEN = 4  # грубая оценка для английского текста
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_by_budget(
+    indices: List[int],
+    texts: List[str],
+    token_budget: int = BATCH_TOKEN_BUDGET,
+    max_items: int = BATCH_MAX_ITEMS,
+) -> List[List[int]]:
+    """
+    Жадно режет индексы на пачки по порядку: сумма токенов <= token_budget и не больше max_items.
+    Статья крупнее бюджета уходит отдельной пачкой.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i in indices:
+        cost = estimate_tokens(texts[i])
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _build_prompt(batch: List[int], texts: List[str], summary_size: str) -> str:
+    articles = json.dumps([{"index": i, "text": texts[i]} for i in batch], ensure_ascii=False)
+    return (
+        "You are an experienced equity market analyst.\n"
+        "You will be given a JSON array of news articles about publicly traded companies, "
+        "each with an integer \"index\".\n"
+        "For EACH article:\n"
+        f"1) write a concise, neutral summary of the article in English ({summary_length_hint(summary_size)}),\n"
+        "2) give your expert opinion on how this news is likely to affect the company’s stock price,\n"
+        "3) provide a single numeric impact score from -10 (extremely strong negative) to +10 "
+        "(extremely strong positive), 0 meaning no meaningful or unclear impact.\n"
+        "\n"
+        f"{ANALYSIS_RULES}"
+        "- Return exactly one object per input article, with the same \"index\". Analyze articles independently.\n"
+        "\n"
+        "Return a JSON array in this format exactly:\n"
+        "\n"
+        "[\n"
+        "  {\n"
+        "    \"index\": 0,\n"
+        "    \"summary\": \"Summary of the article.\",\n"
+        "    \"priceImpactExplanation\": \"Why this news is likely to move the stock price and in which direction.\",\n"
+        "    \"priceImpactScore\": 0\n"
+        "  }\n"
+        "]\n"
+        "\n"
+        "Articles:\n"
+        f"{articles}"
+    )
+
+
+def _parse_indexed_array(raw: str) -> List[Dict[str, Any]]:
+    """
+    Достаёт JSON-массив объектов из ответа модели (чистый JSON, ```json```-блок,
+    подстрока [...] или {"items": [...]}). Непарсящийся ответ — пустой список.
+    """
+    text = raw.strip()
+    if text.startswith("```"):
+        lines = text.splitlines()[1:]
+        if lines and lines[-1].startswith("```"):
+            lines = lines[:-1]
+        text = "\n".join(lines).strip()
+
+    data: Any = None
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        m = re.search(r"\[[\s\S]*\]", text)
+        if m:
+            try:
+                data = json.loads(m.group(0))
+            except json.JSONDecodeError:
+                data = None
+    if isinstance(data, dict):
+        data = data.get("items") or data.get("results")
+    if not isinstance(data, list):
+        return []
+    return [item for item in data if isinstance(item, dict)]
+
+
+def _analyze_batch(batch: List[int], texts: List[str], summary_size: str) -> Dict[int, Dict[str, Any]]:
+    """
+    Один запрос к модели на пачку. Возвращает только валидные ответы с индексами из пачки;
+    индекс, встретившийся в ответе дважды, считается недостающим.
+    """
+    response = _client.models.generate_content(
+        model=GEMINI_MODEL,
+        contents=_build_prompt(batch, texts, summary_size),
+        config={"response_mime_type": "application/json"},
+    )
+    wanted = set(batch)
+    results: Dict[int, Dict[str, Any]] = {}
+    duplicated = set()
+    for item in _parse_indexed_array(getattr(response, "text", "") or ""):
+        try:
+            idx = int(item.get("index"))
+        except (TypeError, ValueError):
+            continue
+        if idx not in wanted:
+            continue
+        if idx in results or idx in duplicated:
+            duplicated.add(idx)
+            results.pop(idx, None)
+            continue
+        summary = str(item.get("summary", "")).strip()
+        opinion = str(item.get("priceImpactExplanation", "")).strip()
+        if not summary or not opinion:
+            continue
+        results[idx] = {
+            "summary": summary,
+            "priceImpactExplanation": opinion,
+            "priceImpactScore": _clamp_score(item.get("priceImpactScore", 0.0)),
+        }
+    return results
+
+
+def _error_result(reason: str) -> Dict[str, Any]:
+    return {
+        "summary": f"Error while summarizing: {reason}",
+        "priceImpactExplanation": f"Error while calling model: {reason}",
+        "priceImpactScore": 0.0,
+    }
+
+
+def analyze_articles(
+    texts: List[str],
+    summary_size: str = "medium",
+    token_budget: int = BATCH_TOKEN_BUDGET,
+    max_items: int = BATCH_MAX_ITEMS,
+    initial_delay: float = 1.0,
+    deadline: float = BATCH_DEADLINE_SECONDS,
+) -> List[Dict[str, Any]]:
+    """
+    analyze_article для многих статей за несколько запросов к модели.
+
+    Статьи из llm_cache не отправляются; остальные пакуются в пачки по token_budget,
+    пачки одного раунда идут параллельно (общий пул Gemini). Каждому входу должен
+    соответствовать ровно один ответ с его индексом: недостающие индексы уходят
+    в следующий раунд. После MAX_ROUNDS оставшиеся идут по одной через analyze_article
+    в тот же пул — только если модель в последнем раунде отвечала; иначе, как и после
+    deadline секунд, на их месте ответ-ошибка. Результат — в порядке texts.
+    """
+    stop_at = time.monotonic() + deadline
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    keys = [analysis_cache_key(t, summary_size) if t and t.strip() else None for t in texts]
+
+    missing: List[int] = []
+    for i, text in enumerate(texts):
+        if keys[i] is None:
+            results[i] = analyze_article(text)  # пустой текст — стандартный ответ без модели
+            continue
+        cached = llm_cache.get(keys[i])
+        if cached is not None:
+            results[i] = cached
+        else:
+            missing.append(i)
+
+    reason = "no valid answer from the model"
+    model_answering = True
+    for round_no in range(MAX_ROUNDS):
+        if not missing:
+            break
+        if round_no > 0:
+            delay = initial_delay * (2 ** (round_no - 1))
+            if time.monotonic() + delay >= stop_at:
+                break
+            time.sleep(delay)
+        batches = split_by_budget(missing, texts, token_budget, max_items)
+        futures = [model_pool.submit(_analyze_batch, batch, texts, summary_size) for batch in batches]
+        _, not_done = wait(futures, timeout=max(0.0, stop_at - time.monotonic()))
+        answered = failed = 0
+        for batch, f in zip(batches, futures):
+            if f in not_done:
+                f.cancel()
+                reason = "deadline exceeded"
+                continue
+            if f.exception() is not None:
+                reason = str(f.exception())
+                failed += len(batch)
+                continue
+            answered += 1
+            for idx, res in f.result().items():
+                results[idx] = res
+                llm_cache.put(keys[idx], res)
+        if failed:
+            print(f"[batch round {round_no + 1}/{MAX_ROUNDS}] {failed} articles failed: {reason}")
+        model_answering = answered > 0
+        missing = [i for i in missing if results[i] is None]
+        if not_done:
+            break
+
+    if missing and model_answering and time.monotonic() < stop_at:
+        jobs = {i: model_pool.submit(analyze_article, texts[i], summary_size, 1) for i in missing}
+        _, not_done = wait(jobs.values(), timeout=max(0.0, stop_at - time.monotonic()))
+        for i, f in jobs.items():
+            if f in not_done:
+                f.cancel()
+            elif f.exception() is None:
+                results[i] = f.result()
+        missing = [i for i in missing if results[i] is None]
+        if not_done:
+            reason = "deadline exceeded"
+
+    for i in missing:
+        results[i] = _error_result(reason)
+
+    return results
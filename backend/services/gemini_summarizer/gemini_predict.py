@@ -2,23 +2,31 @@
 import time
 import json
 import re
-from typing import Dict, Any
-from services.gemini_summarizer.config import get_gemini_client
+from typing import Any, Dict, Optional, Tuple
+from services.gemini_summarizer.config import GEMINI_MODEL, get_gemini_client
+from services.gemini_summarizer.gemini_summarizer import summary_length_hint
+from services.gemini_summarizer.llm_cache import llm_cache, make_key
 
 _client = get_gemini_client()
 
+# поднять при изменении промпта: старые ответы в кэше перестанут находиться
+PREDICTION_PROMPT_VERSION = "prediction-v2"
+ANALYSIS_PROMPT_VERSION = "analysis-v2"
 
-def _parse_price_impact(raw: str) -> Dict[str, Any]:
-    """
-    Разбирает сырое текстовое сообщение от модели и пытается достать:
-    - priceImpactExplanation: str
-    - priceImpactScore: float
+# общие правила ответа для промптов news_prediction / analyze_article / пакетного анализа
+ANALYSIS_RULES = (
+    "Very important:\n"
+    "- For demonstration purposes never give impact score 0. Always return at least some opinion about the possible impact\n"
+    "- Base your reasoning ONLY on the information in the article and general market logic.\n"
+    "- Do NOT give trading advice like \"buy\", \"sell\" or \"hold\".\n"
+    "- Answer STRICTLY in valid JSON with double quotes and no extra text before or after the JSON.\n"
+)
 
-    Обрабатывает случаи:
-    - чистый JSON
-    - JSON внутри ```json ... ```
-    - JSON как подстрока внутри ответа
-    - если JSON нет — берёт всё как explanation и последнее число как score
+
+def _parse_json_reply(raw: str) -> Optional[Dict[str, Any]]:
+    """
+    JSON-объект из ответа модели: чистый JSON, JSON внутри ```json ... ```
+    или первый {...} внутри текста. Если JSON нет — None.
     """
     text = raw.strip()
 
@@ -54,8 +62,26 @@ def _parse_price_impact(raw: str) -> Dict[str, Any]:
         except json.JSONDecodeError:
             pass
 
+    return None
+
+
+def _parse_price_impact(raw: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Разбирает сырое текстовое сообщение от модели и пытается достать:
+    - priceImpactExplanation: str
+    - priceImpactScore: float
+
+    Возвращает (data, from_json). JSON ищется через _parse_json_reply;
+    если JSON нет — берёт всё как explanation и последнее число как score,
+    и from_json=False: такой ответ можно показать, но не кэшировать.
+    """
+    data = _parse_json_reply(raw)
+    if data is not None:
+        return data, True
+
     # 4) Фолбэк: возвращаем весь текст как explanation,
     #    а score берём как ПОСЛЕДНЕЕ число в тексте
+    text = raw.strip()
     matches = list(re.finditer(r"-?\d+(\.\d+)?", text))
     if matches:
         try:
@@ -68,7 +94,7 @@ def _parse_price_impact(raw: str) -> Dict[str, Any]:
     return {
         "priceImpactExplanation": text,
         "priceImpactScore": score,
-    }
+    }, False
 
 
 def news_prediction(
@@ -95,6 +121,11 @@ def news_prediction(
     if not article_text or not article_text.strip():
         return default_response
 
+    cache_key = make_key("prediction", PREDICTION_PROMPT_VERSION, GEMINI_MODEL, article_text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     prompt = (
         "You are an experienced equity market analyst.\n"
         "You will be given a full news article about a publicly traded company.\n"
@@ -107,11 +138,7 @@ def news_prediction(
         "    +5 = clearly positive impact,\n"
         "   +10 = extremely strong positive impact.\n"
         "\n"
-        "Very important:\n"
-        "- For demonstration purposes never give impact score 0. Always ruturn at lest some opinion about posible impact\n"
-        "- Base your reasoning ONLY on the information in the article and general market logic.\n"
-        "- Do NOT give trading advice like \"buy\", \"sell\" or \"hold\".\n"
-        "- Answer STRICTLY in valid JSON with double quotes and no extra text before or after the JSON.\n"
+        f"{ANALYSIS_RULES}"
         "\n"
         "Use the following JSON format exactly:\n"
         "\n"
@@ -133,7 +160,7 @@ def news_prediction(
     for attempt in range(max_retries):
         try:
             response = _client.models.generate_content(
-                model="gemini-2.5-flash-lite",
+                model=GEMINI_MODEL,
                 contents=prompt,
             )
 
@@ -145,7 +172,7 @@ def news_prediction(
                 }
 
             # КЛЮЧЕВОЕ: аккуратно парсим, учитывая ```json``` и вложенный JSON
-            data = _parse_price_impact(raw)
+            data, from_json = _parse_price_impact(raw)
 
             opinion = str(data.get("priceImpactExplanation", "")).strip()
             score_value = data.get("priceImpactScore", 0.0)
@@ -162,13 +189,14 @@ def news_prediction(
             elif score > 10:
                 score = 10.0
 
-            if not opinion:
-                opinion = "No explanation provided by the model."
-
-            return {
-                "priceImpactExplanation": opinion,
+            result = {
+                "priceImpactExplanation": opinion or "No explanation provided by the model.",
                 "priceImpactScore": float(score),
             }
+            # кэшируем только разобранный JSON с нужными ключами: не заглушки и не regex-фолбэк
+            if from_json and opinion and "priceImpactScore" in data:
+                llm_cache.put(cache_key, result)
+            return result
 
         except Exception as e:
             last_error = e
@@ -196,3 +224,166 @@ def news_prediction(
         "priceImpactExplanation": f"Failed to get prediction after {max_retries} attempts: {last_error}",
         "priceImpactScore": 0.0,
     }
+
+
+def _clamp_score(value: Any) -> float:
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return max(-10.0, min(10.0, score))
+
+
+def analysis_cache_key(article_text: str, summary_size: str = "medium") -> str:
+    """
+    Ключ llm_cache для результата analyze_article (общий с пакетным анализом).
+    """
+    return make_key(
+        "analysis", ANALYSIS_PROMPT_VERSION, GEMINI_MODEL, article_text, summary_length_hint(summary_size)
+    )
+
+
+class AnalysisError(RuntimeError):
+    """
+    Модель не дала годного ответа. result — ответ-заглушка в формате analyze_article
+    (с текстом ошибки) для тех, кто всё равно отдаёт его клиенту.
+    """
+
+    def __init__(self, message: str, result: Dict[str, Any]):
+        super().__init__(message)
+        self.result = result
+
+
+def request_analysis(
+    article_text: str,
+    summary_size: str = "medium",
+    max_retries: int = 3,
+    initial_delay: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    То же, что analyze_article, но неудача (пустой текст, ошибка модели после повторов,
+    пустой или неполный ответ) — AnalysisError, а не ответ-заглушка.
+    Возвращает только настоящие ответы модели (или из llm_cache).
+    """
+    if not article_text or not article_text.strip():
+        raise AnalysisError("empty article text", {
+            "summary": "No text provided for summarization.",
+            "priceImpactExplanation": "No text provided for prediction.",
+            "priceImpactScore": 0.0,
+        })
+
+    length_hint = summary_length_hint(summary_size)
+    cache_key = analysis_cache_key(article_text, summary_size)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = (
+        "You are an experienced equity market analyst.\n"
+        "You will be given a news article about a publicly traded company.\n"
+        "Your task is to:\n"
+        f"1) write a concise, neutral summary of the article in English ({length_hint}),\n"
+        "2) give your expert opinion on how this news is likely to affect the company’s stock price,\n"
+        "3) provide a single numeric impact score from -10 (extremely strong negative) to +10 "
+        "(extremely strong positive), 0 meaning no meaningful or unclear impact.\n"
+        "\n"
+        f"{ANALYSIS_RULES}"
+        "\n"
+        "Use the following JSON format exactly:\n"
+        "\n"
+        "{\n"
+        "  \"summary\": \"Summary of the article.\",\n"
+        "  \"priceImpactExplanation\": \"Why this news is likely to move the stock price and in which direction.\",\n"
+        "  \"priceImpactScore\": 0\n"
+        "}\n"
+        "\n"
+        "Now read and analyze the following news article:\n"
+        "\n"
+        f"{article_text}"
+    )
+
+    last_error: Exception | None = None
+
+    for attempt in range(max_retries):
+        try:
+            response = _client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=prompt,
+                config={"response_mime_type": "application/json"},
+            )
+        except Exception as e:
+            last_error = e
+            error_str = str(e)
+
+            if (
+                "503" in error_str
+                or "overloaded" in error_str.lower()
+                or "unavailable" in error_str.lower()
+            ) and attempt < max_retries - 1:
+                delay = initial_delay * (2 ** attempt)
+                print(
+                    f"[Attempt {attempt + 1}/{max_retries}] Service unavailable. "
+                    f"Retrying in {delay}s..."
+                )
+                time.sleep(delay)
+                continue
+
+            raise AnalysisError(error_str, {
+                "summary": f"Error while summarizing: {error_str}",
+                "priceImpactExplanation": f"Error while calling model: {error_str}",
+                "priceImpactScore": 0.0,
+            }) from e
+
+        raw = (getattr(response, "text", "") or "").strip()
+        if not raw:
+            raise AnalysisError("empty model reply", {
+                "summary": "Model did not return a summary.",
+                "priceImpactExplanation": "Model did not return any explanation.",
+                "priceImpactScore": 0.0,
+            })
+
+        data, from_json = _parse_price_impact(raw)
+        summary = str(data.get("summary", "")).strip()
+        opinion = str(data.get("priceImpactExplanation", "")).strip()
+
+        result = {
+            "summary": summary or "Model did not return a summary.",
+            "priceImpactExplanation": opinion or "No explanation provided by the model.",
+            "priceImpactScore": _clamp_score(data.get("priceImpactScore", 0.0)),
+        }
+        if not (summary and opinion):  # заглушки не кэшируем и не выдаём за ответ
+            raise AnalysisError("incomplete model reply", result)
+        if from_json and "priceImpactScore" in data:  # regex-фолбэк отдаём, но не кэшируем
+            llm_cache.put(cache_key, result)
+        return result
+
+    raise AnalysisError(f"failed after {max_retries} attempts: {last_error}", {
+        "summary": f"Failed to generate summary after {max_retries} attempts: {last_error}",
+        "priceImpactExplanation": f"Failed to get prediction after {max_retries} attempts: {last_error}",
+        "priceImpactScore": 0.0,
+    })
+
+
+def analyze_article(
+    article_text: str,
+    summary_size: str = "medium",
+    max_retries: int = 3,
+    initial_delay: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    Резюме и прогноз влияния на цену одним вызовом Gemini (вместо summarize_text + news_prediction):
+
+    {
+      "summary": <str>,
+      "priceImpactExplanation": <str>,
+      "priceImpactScore": <float>
+    }
+
+    Модель отвечает JSON (response_mime_type), ответ разбирается _parse_price_impact.
+    Ошибки и повторы — как в news_prediction: при неудаче вместо ответа — заглушка
+    с текстом ошибки (см. request_analysis, если неудачу нужно отличать).
+    """
+    try:
+        return request_analysis(article_text, summary_size, max_retries, initial_delay)
+    except AnalysisError as e:
+        return e.result
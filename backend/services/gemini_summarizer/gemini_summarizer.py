@@ -1,10 +1,25 @@
 # gemini_summarizer.py
 import time
 from typing import Dict, Any
-from services.gemini_summarizer.config import get_gemini_client
+from services.gemini_summarizer.config import GEMINI_MODEL, get_gemini_client
+from services.gemini_summarizer.llm_cache import llm_cache, make_key
 
 _client = get_gemini_client()
 
+SUMMARY_PROMPT_VERSION = "summary-v1"  # поднять при изменении промпта (ключ кэша)
+
+
+def summary_length_hint(summary_size: str) -> str:
+    """
+    'short' | 'medium' | 'long' -> желаемая длина резюме словами для промпта.
+    """
+    size = (summary_size or "medium").lower()
+    if size == "short":
+        return "1–2 sentences"
+    if size == "long":
+        return "4–6 sentences"
+    return "2–3 sentences"
+
 
 def summarize_text(
     article_text: str,
@@ -37,18 +52,13 @@ def summarize_text(
     if not article_text or not article_text.strip():
         return default_response
 
-    # Нормализуем размер резюме
-    size = (summary_size or "medium").lower()
-    if size not in {"short", "medium", "long"}:
-        size = "medium"
+    cache_key = make_key("summary", SUMMARY_PROMPT_VERSION, GEMINI_MODEL, article_text, summary_length_hint(summary_size))
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     # Описание длины в человеко-понятном виде
-    if size == "short":
-        length_hint = "1–2 sentences"
-    elif size == "long":
-        length_hint = "4–6 sentences"
-    else:  # medium
-        length_hint = "2–3 sentences"
+    length_hint = summary_length_hint(summary_size)
 
     prompt = (
         "Write a concise summary of the following news article in English. "
@@ -62,15 +72,17 @@ def summarize_text(
     for attempt in range(max_retries):
         try:
             response = _client.models.generate_content(
-                model="gemini-2.5-flash-lite",
+                model=GEMINI_MODEL,
                 contents=prompt,
             )
 
             summary_text = getattr(response, "text", "").strip()
             if not summary_text:
-                summary_text = "Model did not return a summary."
+                return {"summary": "Model did not return a summary."}
 
-            return {"summary": summary_text}
+            result = {"summary": summary_text}
+            llm_cache.put(cache_key, result)
+            return result
 
         except Exception as e:
             last_error = e
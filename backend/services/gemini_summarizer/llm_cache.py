@@ -0,0 +1,164 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# backend/data_cache/ (как .npy-кэш FundData) — в .gitignore
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[2] / "data_cache" / "llm_cache.sqlite3"
+CACHE_PATH = Path(os.environ.get("LLM_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "50000"))
+EVICT_EVERY = 100  # чистка просроченных/лишних записей раз в столько записей
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created_at);
+"""
+
+
+def make_key(kind: str, prompt_version: str, model: str, text: str, summary_size: str = "") -> str:
+    """
+    Адрес результата: sha256 от (тип, версия промпта, модель, текст статьи, summary_size).
+    Поменяли промпт — поднимите версию, и старые ответы перестанут находиться.
+    """
+    payload = json.dumps([kind, prompt_version, model, summary_size or "", text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Постоянный кэш ответов модели в SQLite: переживает рестарт и общий для всех
+    воркеров uvicorn (WAL, одно соединение на поток). Записи старше ttl не отдаются;
+    при переполнении max_entries удаляются самые старые. Если файл не открывается,
+    кэш выключается; разовые ошибки (блокировка другим воркером) пропускают одну операцию.
+    Счётчики hits/misses — на процесс.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+        self._puts = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), timeout=5.0)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                # файл не открыть — кэш только ускорение, дальше работаем без него
+                self._disable(e)
+                return None
+            self._local.conn = conn
+        return conn
+
+    def _disable(self, e: Exception) -> None:
+        if self.enabled:
+            print(f"[llm_cache] disabled: {e}")
+        self.enabled = False
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._conn() if self.enabled else None
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        except sqlite3.Error as e:
+            # например "database is locked" при записи из соседнего воркера — пропускаем одно чтение
+            print(f"[llm_cache] get skipped: {e}")
+            return None
+        self._count(row is not None)
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        conn = self._conn() if self.enabled else None
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+            with self._lock:
+                self._puts += 1
+                evict = self._puts % EVICT_EVERY == 0
+            if evict:
+                self.evict()
+        except sqlite3.Error as e:
+            print(f"[llm_cache] put skipped: {e}")
+
+    def evict(self) -> int:
+        """
+        Удаляет просроченные записи и самые старые сверх max_entries; возвращает число удалённых.
+        """
+        conn = self._conn()
+        if conn is None:
+            return 0
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            removed += conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        return removed
+
+    def clear(self) -> None:
+        conn = self._conn()
+        if conn is None:
+            return
+        with conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        entries = None
+        conn = self._conn() if self.enabled else None
+        if conn is not None:
+            try:
+                entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            except sqlite3.Error as e:
+                print(f"[llm_cache] stats skipped: {e}")
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl,
+        }
+
+
+llm_cache = LLMCache()
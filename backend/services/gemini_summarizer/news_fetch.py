@@ -1,45 +1,20 @@
 import re
 import datetime as dt
 import hashlib
-import requests
-from typing import List, Dict, Any, Iterable
-from services.gemini_summarizer.config import get_newsapi_key
-from services.gemini_summarizer.gemini_summarizer import summarize_text
-from services.gemini_summarizer.gemini_predict import news_prediction
-
-# Справочник тикеров
-TICKER_COMPANIES: Dict[str, str] = {
-    "MSFT": "Microsoft",
-    "AAPL": "Apple",
-    "KO": "Coca-Cola",
-    "WMT": "Walmart",
-    "PEP": "PepsiCo",
-    "JNJ": "Johnson & Johnson",
-    "V": "Visa",
-    "JPM": "JPMorgan",
-    "UNH": "UnitedHealth",
-    "XOM": "Exxon Mobil",
-    "AMZN": "Amazon",
-    "GOOGL": "Alphabet",
-    "META": "Meta Platforms",
-    "COST": "Costco",
-    "DIS": "Disney",
-    "INTC": "Intel",
-    "CSCO": "Cisco",
-    "BA": "Boeing",
-    "GE": "General Electric",
-    "NKE": "Nike",
-    "TSLA": "Tesla",
-    "NVDA": "NVIDIA",
-    "AMD": "AMD",
-    "PLTR": "Palantir",
-    "SHOP": "Shopify",
-    "SOFI": "SoFi",
-    "HOOD": "Robinhood",
-    "RBLX": "Roblox",
-    "COIN": "Coinbase",
-    "RIOT": "Riot Platforms",
-}
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from services.gemini_summarizer.config import get_newsapi_key, model_pool
+from services.gemini_summarizer.news_http import (
+    CONNECT_TIMEOUT,
+    NEWS_API_BASE_URL,
+    POOL_SIZE,
+    READ_TIMEOUT,
+    NewsHttpClient,
+    get_news_http_client,
+)
+from services.gemini_summarizer.gemini_predict import request_analysis
+from services.gemini_summarizer.companies import TICKER_COMPANIES
+
 
 SOURCE_WHITELIST = {
     s.lower(): s for s in [
@@ -99,6 +74,13 @@ MONEY_OR_PERCENT_PATTERN = re.compile(
     r"(\$[\d.,]+)|(\b\d+(\.\d+)?\s*(%|percent|percentage)\b)|(\b\d+(\.\d+)?\s*(billion|million|bn|m)\b)"
 )
 
+GROUP_SIZE = 5  # тикеров в одном запросе к NewsAPI
+FETCH_DEADLINE_SECONDS = 12.0  # общий дедлайн на все запросы одного fetch_financial_news
+
+# общий пул на процесс: запросы групп идут параллельно, без создания потоков на каждый /news
+_fetch_pool = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="newsapi")
+ENRICH_DEADLINE_SECONDS = 20.0  # после дедлайна статьи отдаются без модели
+
 def _hash_id(source_url: str) -> str:
     return hashlib.sha256(source_url.encode("utf-8")).hexdigest()[:24]
 
@@ -119,6 +101,73 @@ def _looks_financial(title: str, desc: str, content: str) -> bool:
 
     return bool(has_fin_keyword or has_money_pattern)
 
+def _group_params(
+    group: List[str],
+    language: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    max_per_ticker: int,
+) -> Dict[str, Any]:
+    query_parts = []
+    for tk in group:
+        comp = TICKER_COMPANIES[tk]
+        query_parts.append(f'("{comp}" OR {tk})')
+    return {
+        "q": " OR ".join(query_parts),
+        "language": language,
+        "from": start.isoformat(timespec="seconds") + "Z",
+        "to": end.isoformat(timespec="seconds") + "Z",
+        "sortBy": "publishedAt",
+        "pageSize": min(100, max_per_ticker * len(group)),
+    }
+
+def _fetch_groups(
+    param_sets: List[Dict[str, Any]],
+    headers: Dict[str, str],
+    http: NewsHttpClient,
+    url: str,
+    deadline: float,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Запрашивает все группы параллельно и возвращает статьи в порядке групп.
+    Группа с ошибкой, не-200 или не уложившаяся в deadline даёт пустой список.
+    """
+    futures = [
+        _fetch_pool.submit(http.get_json, url, params, headers, (CONNECT_TIMEOUT, READ_TIMEOUT))
+        for params in param_sets
+    ]
+    done, not_done = wait(futures, timeout=deadline)
+    for f in not_done:
+        f.cancel()
+
+    articles: List[List[Dict[str, Any]]] = []
+    for f in futures:
+        data = f.result() if f in done and f.exception() is None else None
+        articles.append((data or {}).get("articles") or [])
+    return articles
+
+def _enrich_items(pending: List[Tuple[Dict[str, Any], str]], deadline: float) -> None:
+    """
+    Резюме и прогноз (один вызов request_analysis) для всех (item, text) сразу:
+    вызовы идут в общий пул с лимитом MODEL_CONCURRENCY. Что не успело к deadline
+    или не получило ответа модели (AnalysisError), остаётся с описанием статьи
+    вместо резюме и "No data" вместо прогноза — тексты ошибок пользователю не уходят.
+    """
+    if not pending:
+        return
+    jobs = [(item, model_pool.submit(request_analysis, text)) for item, text in pending]
+    _, not_done = wait([f for _, f in jobs], timeout=deadline)
+    for f in not_done:
+        f.cancel()
+
+    for item, f in jobs:
+        if not f.done() or f.cancelled() or f.exception() is not None:
+            continue
+        res = f.result()
+        item["summary"] = {"summary": res["summary"]}  # формат summarize_text, как раньше
+        item["educationalNote"] = res["priceImpactExplanation"]
+        item["priceImpact"] = float(res["priceImpactScore"])
+
 def fetch_financial_news(
     tickers: List[str],
     days: int = 1,
@@ -126,39 +175,29 @@ def fetch_financial_news(
     max_per_ticker: int = 1,
     dedup: bool = True,
     use_model: int = 0,
+    http: Optional[NewsHttpClient] = None,
+    deadline: float = FETCH_DEADLINE_SECONDS,
+    enrich_deadline: float = ENRICH_DEADLINE_SECONDS,
 ) -> List[Dict[str, Any]]:
     api_key = get_newsapi_key()
     end = dt.datetime.now(dt.timezone.utc)
     start = end - dt.timedelta(days=days)
     results: List[Dict[str, Any]] = []
+    texts: Dict[str, str] = {}  # id статьи -> полный текст для модели
     seen_urls = set()
 
     norm_tickers = [t.upper() for t in tickers if t.upper() in TICKER_COMPANIES]
 
-    base_url = "https://newsapi.org/v2/everything"
     headers = {"X-Api-Key": api_key}
+    param_sets = [
+        _group_params(group, language, start, end, max_per_ticker)
+        for group in _chunks(norm_tickers, GROUP_SIZE)
+    ]
+    fetched = _fetch_groups(
+        param_sets, headers, http or get_news_http_client(), f"{NEWS_API_BASE_URL}/everything", deadline,
+    )
 
-    for group in _chunks(norm_tickers, 5):
-        query_parts = []
-        for tk in group:
-            comp = TICKER_COMPANIES[tk]
-            query_parts.append(f'("{comp}" OR {tk})')
-        q = " OR ".join(query_parts)
-
-        params = {
-            "q": q,
-            "language": language,
-            "from": start.isoformat(timespec="seconds") + "Z",
-            "to": end.isoformat(timespec="seconds") + "Z",
-            "sortBy": "publishedAt",
-            "pageSize": min(100, max_per_ticker * len(group)),
-        }
-
-        resp = requests.get(base_url, params=params, headers=headers, timeout=15)
-        if resp.status_code != 200:
-            continue
-        data = resp.json()
-        articles = data.get("articles", [])
+    for articles in fetched:
         for art in articles:
             url = art.get("url") or ""
             if dedup and url in seen_urls:
@@ -192,27 +231,7 @@ def fetch_financial_news(
             timestamp = art.get("publishedAt") or end.isoformat() + "Z"
             main_ticker = related[0]
 
-            if use_model > 0:
-                try:
-                    pred = news_prediction(combined)
-                    price_expl = pred.get("priceImpactExplanation", "")
-                    price_score = float(pred.get("priceImpactScore", 0.0))
-                except Exception:
-                    price_expl = "No data"
-                    price_score = float(0.0)
-
-                try:
-                    summary_val = summarize_text(
-                        article_text=combined,
-                    )
-                except Exception:
-                    summary_val = desc or title
-                use_model = use_model - 1
-            else:
-                price_expl = "No data"
-                price_score = float(0.0)
-                summary_val = desc or title
-
+            # без модели (или если она не успеет) — описание статьи
             item = {
                 "id": _hash_id(url or title + timestamp),
                 "title": title,
@@ -220,13 +239,14 @@ def fetch_financial_news(
                 "company": TICKER_COMPANIES[main_ticker],
                 "sourceUrl": url,
                 "timestamp": timestamp,
-                "summary": summary_val,
-                "priceImpact": price_score,
-                "educationalNote": price_expl,
+                "summary": desc or title,
+                "priceImpact": 0.0,
+                "educationalNote": "No data",
                 "relatedTickers": related,
                 "rawSource": art.get("source", {}).get("name"),
             }
             results.append(item)
+            texts[item["id"]] = combined
 
     # Ограничение количества на тикер
     if max_per_ticker > 0:
@@ -238,6 +258,10 @@ def fetch_financial_news(
             trimmed.extend(lst[:max_per_ticker])
         results = trimmed
 
+    # модель — только для статей, которые попадут в ответ (первые use_model)
+    if use_model > 0:
+        _enrich_items([(item, texts[item["id"]]) for item in results[:use_model]], enrich_deadline)
+
     # Сортировка по времени (новые сначала)
     results.sort(key=lambda x: x["timestamp"], reverse=True)
     return results
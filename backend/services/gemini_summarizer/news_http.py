@@ -0,0 +1,84 @@
+# news_http.py
+import os
+import threading
+from typing import Any, Dict, Optional, Protocol, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Базовый URL NewsAPI; для локального стаба — NEWS_API_BASE_URL=http://127.0.0.1:8099/v2
+NEWS_API_BASE_URL = os.environ.get("NEWS_API_BASE_URL", "https://newsapi.org/v2")
+POOL_SIZE = 8
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10.0
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class NewsHttpClient(Protocol):
+    """
+    HTTP-слой фетчера новостей: GET -> JSON (или None при ошибке / не-200).
+    Подменяется через set_news_http_client (например, стаб в тестах).
+    """
+
+    def get_json(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+        timeout: Timeout,
+    ) -> Optional[Dict[str, Any]]:
+        ...
+
+
+class SessionHttpClient:
+    """
+    Общий requests.Session с пулом соединений: TLS-рукопожатие с NewsAPI
+    делается один раз на соединение, а не на каждый запрос.
+    Session потокобезопасен для параллельных GET при pool_maxsize >= числу потоков.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+        timeout: Timeout = (CONNECT_TIMEOUT, READ_TIMEOUT),
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            resp = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        except requests.RequestException:
+            return None
+        if resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+
+_client: Optional[NewsHttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_news_http_client() -> NewsHttpClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SessionHttpClient()
+        return _client
+
+
+def set_news_http_client(client: Optional[NewsHttpClient]) -> None:
+    """
+    Подменяет HTTP-слой для всех запросов к NewsAPI; None — вернуть стандартный.
+    """
+    global _client
+    with _client_lock:
+        _client = client
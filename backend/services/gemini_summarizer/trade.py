@@ -1,6 +1,10 @@
 # trading_engine.py
 from dataclasses import dataclass
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Sequence, Tuple, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
 
 
 @dataclass
@@ -103,8 +107,9 @@ def generate_trades(
                 )
 
     # HOLD для остальных
+    traded = {o["ticker"] for o in orders}
     for c in companies:
-        if any(o["ticker"] == c.ticker for o in orders):
+        if c.ticker in traded:
             continue
         conf = float(confidences.get(c.ticker, 0.0))
         orders.append(
@@ -130,3 +135,181 @@ def generate_trades(
             "Not financial advice."
         ),
     }
+
+
+def generate_trades_batch(
+    wallets: Sequence[float],
+    holdings: Sequence[Dict[str, int]],
+    companies: List[Company],
+    confidences: Dict[str, float],
+    max_company_share: float = 0.25,
+    min_buy_confidence: float = 0.5,
+    max_sell_confidence: float = 0.3,
+    include_hold: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    generate_trades сразу для многих кошельков с общими ценами и уверенностью.
+
+    Ордера считаются одним вызовом rebalance_arrays на матрице (кошельки x компании);
+    Python-цикл остаётся только на сборку ответа в формате generate_trades.
+    Продажи перечисляются в порядке companies; include_hold=False убирает HOLD-строки.
+    """
+    if len(wallets) != len(holdings):
+        raise ValueError("wallets length != holdings length")
+    tickers = [c.ticker for c in companies]
+    column = {t: j for j, t in enumerate(tickers)}
+    prices = np.array([c.price for c in companies], dtype=np.float64)
+    conf = np.array([float(confidences.get(t, 0.0)) for t in tickers], dtype=np.float64)
+
+    held = np.zeros((len(wallets), len(companies)), dtype=np.int64)
+    for i, row in enumerate(holdings):
+        for ticker, shares in (row or {}).items():
+            j = column.get(ticker)
+            if j is not None:
+                held[i, j] = shares
+
+    cash, final_held, sold, bought = rebalance_arrays(
+        np.asarray(wallets, dtype=np.float64), held, prices, conf,
+        max_company_share, min_buy_confidence, max_sell_confidence,
+    )
+    # в Python-списки один раз: поэлементный доступ к numpy-массивам медленный
+    sold_rows = sold.tolist()
+    bought_rows = bought.tolist()
+    final_rows = final_held.tolist()
+    sell_values = (-sold * prices).tolist()
+    buy_values = (bought * prices).tolist()
+    conf_list = conf.tolist()
+    hold_orders = [
+        {
+            "ticker": c.ticker,
+            "company": c.name,
+            "side": "hold",
+            "sharesDelta": 0,
+            "tradeValue": 0.0,
+            "price": c.price,
+            "confidence": conf_list[j],
+        }
+        for j, c in enumerate(companies)
+    ]
+
+    results: List[Dict[str, Any]] = []
+    for i, row in enumerate(holdings):
+        final_holdings: Dict[str, int] = dict(row or {})
+        sells: List[Dict[str, Any]] = []
+        buys: List[Dict[str, Any]] = []
+        holds: List[Dict[str, Any]] = []
+        bought_i = bought_rows[i]
+        for j, ds in enumerate(sold_rows[i]):
+            db = bought_i[j]
+            if ds == 0 and db == 0:
+                if include_hold:
+                    holds.append(dict(hold_orders[j]))
+                continue
+            c = companies[j]
+            final_holdings[c.ticker] = final_rows[i][j]
+            # продажа и покупка одной компании — две строки, как в generate_trades
+            if ds:
+                sells.append(
+                    {
+                        "ticker": c.ticker,
+                        "company": c.name,
+                        "side": "sell",
+                        "sharesDelta": ds,
+                        "tradeValue": round(sell_values[i][j], 2),
+                        "price": c.price,
+                        "confidence": conf_list[j],
+                    }
+                )
+            if db:
+                buys.append(
+                    {
+                        "ticker": c.ticker,
+                        "company": c.name,
+                        "side": "buy",
+                        "sharesDelta": db,
+                        "tradeValue": round(buy_values[i][j], 2),
+                        "price": c.price,
+                        "confidence": conf_list[j],
+                    }
+                )
+        results.append(
+            {
+                "initialWallet": float(wallets[i]),
+                "finalWallet": round(float(cash[i]), 2),
+                "initialHoldings": dict(row or {}),
+                "finalHoldings": final_holdings,
+                # сначала продажи, потом покупки, потом HOLD — как в generate_trades
+                "orders": sells + buys + holds,
+            }
+        )
+    return results
+
+
+def rebalance_arrays(
+    wallet: np.ndarray,
+    holdings: np.ndarray,
+    prices: np.ndarray,
+    confidences: np.ndarray,
+    max_company_share: ArrayLike = 0.25,
+    min_buy_confidence: ArrayLike = 0.5,
+    max_sell_confidence: ArrayLike = 0.3,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Те же правила, что generate_trades, но в массивах: B кошельков (строки) x C компаний (столбцы).
+
+    wallet — (B,), holdings — (B, C) целые; prices / confidences — (C,) или (B, C);
+    пороги — скаляры или (B,). Компания с ценой <= 0 (или NaN) не торгуется.
+    Продажи — одной маской; покупки, как и в generate_trades, идут по компаниям
+    по порядку (остаток кошелька уменьшается), но каждая — сразу для всех B строк.
+    Возвращает (finalWallet, finalHoldings, sold, bought): sold <= 0 и bought >= 0 —
+    sharesDelta продаж и покупок отдельно (компанию могут и продать, и купить заново).
+    """
+    wallet0 = np.asarray(wallet, dtype=np.float64)
+    n_rows = wallet0.shape[0]
+    held = np.array(holdings, dtype=np.int64)
+    # (C,) превращаем в (1, C): дальше всё считается через broadcasting, без копий
+    price = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    conf = np.atleast_2d(np.asarray(confidences, dtype=np.float64))
+    max_share = _per_row(max_company_share, n_rows)
+    min_buy = _per_row(min_buy_confidence, n_rows)
+    max_sell = _per_row(max_sell_confidence, n_rows)
+    tradable = price > 0  # NaN тоже не торгуется
+
+    # Сначала продажи
+    sell = (held > 0) & tradable & (conf < max_sell[:, None])
+    sold = np.where(sell, -held, 0)
+    # cumsum складывает строго по порядку, как += в generate_trades (np.sum — попарно)
+    proceeds = np.where(sell, held * price, 0.0)
+    cash = np.cumsum(np.concatenate([wallet0[:, None], proceeds], axis=1), axis=1)[:, -1]
+    held[sell] = 0
+
+    # Потом покупки: cap считается от исходного кошелька, доля — от текущего остатка
+    candidates = (conf >= min_buy[:, None]) & tradable
+    total_weight = np.cumsum(np.where(candidates, conf, 0.0), axis=1)[:, -1]
+    candidates &= ((cash > 0) & (total_weight > 0))[:, None]
+    weight = conf / np.where(total_weight > 0, total_weight, 1.0)[:, None]
+    cap = wallet0 * max_share
+
+    # остаток только убывает, поэтому компании, на которые не хватит и на одну акцию
+    # даже при стартовом остатке, можно не обходить
+    upper = np.minimum(np.minimum(cash[:, None] * weight, cap[:, None]), cash[:, None])
+    # делим только на цены > 0: у неторгуемых (0 или NaN, ещё не листингованных) делитель 1
+    safe_price = np.where(tradable, price, 1.0)
+    reachable = candidates & (np.floor_divide(upper, safe_price) >= 1)
+    bought = np.zeros_like(held)
+    for j in np.flatnonzero(reachable.any(axis=0)):
+        p = safe_price[:, j]
+        target = np.minimum(np.minimum(cash * weight[:, j], cap), cash)
+        shares = np.floor_divide(target, p) * reachable[:, j]  # как int(target // price)
+        value = shares * p
+        shares *= value <= cash
+        cash -= shares * p
+        bought[:, j] = shares
+        held[:, j] += bought[:, j]
+
+    return cash, held, sold, bought
+
+
+def _per_row(value: ArrayLike, n_rows: int) -> np.ndarray:
+    arr = np.asarray(value, dtype=np.float64)
+    return arr if arr.shape == (n_rows,) else np.broadcast_to(arr, (n_rows,))
@@ -0,0 +1,160 @@
+import math
+from typing import Any, Dict, List, Literal, Optional, Sequence, Union
+import numpy as np
+from services.average_mu import (
+    ENSEMBLE_PERCENTILES,
+    MAX_ENSEMBLE_CELLS,
+    check_ensemble_size,
+    collect_asset_params,
+    simulate_portfolio_paths,
+)
+
+TRADING_DAYS = 252  # n_steps конфига = один торговый день
+MAX_RISK_PATHS = 10_000
+MAX_RISK_DRAWS = 6_000_000  # n_paths x n_steps x активы: ~0.4 с на запрос (500 x 390 x 30)
+DEFAULT_CONFIDENCE = (0.95, 0.99)
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    return {f"p{p}": float(v) for p, v in zip(ENSEMBLE_PERCENTILES, np.percentile(values, ENSEMBLE_PERCENTILES))}
+
+def value_at_risk(returns: np.ndarray, confidence: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Исторические VaR и CVaR (expected shortfall) по выборке доходностей, как положительные потери.
+    CVaR — среднее худших ceil((1-c)*n) исходов: одна сортировка и cumsum на все уровни.
+    """
+    alpha = 1.0 - np.asarray(confidence, dtype=np.float64)
+    ordered = np.sort(returns)
+    k = np.maximum(1, np.ceil(alpha * ordered.size).astype(np.intp))
+    tail_sums = np.cumsum(ordered)[k - 1]
+    return {
+        "var": -np.quantile(returns, alpha),
+        "cvar": -tail_sums / k,
+    }
+
+def max_drawdowns(paths: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """
+    Максимальная просадка каждого пути (paths x steps) от бегущего максимума, с учётом стартовой стоимости.
+    """
+    peaks = np.maximum.accumulate(paths, axis=1)
+    np.maximum(peaks, start[:, None], out=peaks)
+    return (1.0 - paths / peaks).max(axis=1)
+
+def max_risk_paths(n_assets: int, n_steps: int) -> int:
+    """
+    Сколько путей помещается в MAX_RISK_DRAWS (и в память под матрицу путей)
+    для данного числа активов и шагов, не больше MAX_RISK_PATHS.
+    Один актив x 390 шагов — 10k путей, 30 активов — 512.
+    """
+    return min(MAX_RISK_PATHS, MAX_RISK_DRAWS // (n_assets * n_steps), MAX_ENSEMBLE_CELLS // n_steps)
+
+def portfolio_risk(
+    portfolio_start: float,
+    configs: List[Dict[str, Any]],
+    shares: List[Union[int, float]],
+    n_paths: Optional[int] = None,
+    seed: Optional[int] = None,
+    confidence: Sequence[float] = DEFAULT_CONFIDENCE,
+    risk_free_rate: float = 0.0,
+    bins: int = 20,
+    correlated: bool = False,
+    mode: Literal["parametric", "bootstrap"] = "parametric",
+    block_size: int = 1,
+) -> Dict[str, Any]:
+    """
+    Риск-метрики портфеля по Monte Carlo ансамблю (горизонт — n_steps шагов = один день).
+
+    n_paths=None — максимум по max_risk_paths; больше него — ValueError.
+    Доходности считаются от portfolio_start. Все метрики — редукции по матрице
+    путей (paths x steps) без циклов по путям: VaR/CVaR финальной доходности,
+    распределение максимальной просадки, волатильность и Sharpe по шаговым лог-доходностям
+    (годовые — через TRADING_DAYS, risk_free_rate тоже годовой).
+    """
+    if len(configs) != len(shares):
+        raise ValueError("configs length != shares length")
+    if portfolio_start <= 0:
+        raise ValueError("portfolio_start must be > 0")
+    if any(not 0.0 < c < 1.0 for c in confidence):
+        raise ValueError("confidence levels must be in (0, 1)")
+
+    shares_vec = np.asarray(shares, dtype=np.float64)
+    if np.any(shares_vec < 0):
+        raise ValueError("shares must be >= 0")
+
+    params = collect_asset_params(configs, correlated=correlated, mode=mode, block_size=block_size)
+    allowed = max_risk_paths(params.P0.size, params.n_steps)
+    if allowed < 2:
+        raise ValueError("portfolio too large for a risk estimate: assets * n_steps must be <= {}".format(MAX_RISK_DRAWS // 2))
+    if n_paths is None:
+        n_paths = allowed
+    elif n_paths < 2:
+        raise ValueError("n_paths must be >= 2")
+    elif n_paths > allowed:
+        raise ValueError("n_paths must be <= {} for {} assets x {} steps".format(allowed, params.P0.size, params.n_steps))
+    check_ensemble_size(params, n_paths, max_draws=MAX_RISK_DRAWS)
+    if not shares_vec @ params.P0 > 0:
+        # лог-доходности и просадки определены только для положительной стоимости портфеля
+        raise ValueError("initial portfolio value (shares x start prices) must be > 0")
+    n_steps = params.n_steps
+
+    rng = np.random.default_rng(seed)
+    paths = simulate_portfolio_paths(params, shares_vec, n_paths, rng)
+
+    final_returns = paths[:, -1] / portfolio_start - 1.0
+    tail = value_at_risk(final_returns, confidence)
+
+    start = np.full(n_paths, float(shares_vec @ params.P0))
+    drawdowns = max_drawdowns(paths, start)
+    dd_counts, dd_edges = np.histogram(drawdowns, bins=bins)
+
+    # шаговые лог-доходности, первая — от стартовой стоимости портфеля
+    log_paths = np.log(paths)
+    step_returns = np.diff(log_paths, axis=1, prepend=np.log(start)[:, None])
+    steps_per_year = n_steps * TRADING_DAYS
+    rf_step = math.log1p(risk_free_rate) / steps_per_year
+    step_mean = step_returns.mean(axis=1)
+    step_std = step_returns.std(axis=1, ddof=1) if n_steps > 1 else np.zeros(n_paths)
+    annual_vol = step_std * math.sqrt(steps_per_year)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(step_std > 0, (step_mean - rf_step) / step_std, 0.0) * math.sqrt(steps_per_year)
+
+    return {
+        "portfolio_start": float(portfolio_start),
+        "n_paths": int(n_paths),
+        "max_n_paths": int(allowed),
+        "n_steps": int(n_steps),
+        "return": {
+            "mean": float(final_returns.mean()),
+            "std": float(final_returns.std(ddof=1)),
+            "prob_loss": float(np.mean(final_returns < 0)),
+            "percentiles": _percentiles(final_returns),
+        },
+        "var": [
+            {
+                "confidence": float(c),
+                "var": float(v),
+                "cvar": float(cv),
+                "var_amount": float(v * portfolio_start),
+                "cvar_amount": float(cv * portfolio_start),
+            }
+            for c, v, cv in zip(confidence, tail["var"], tail["cvar"])
+        ],
+        "max_drawdown": {
+            "mean": float(drawdowns.mean()),
+            "max": float(drawdowns.max()),
+            "percentiles": _percentiles(drawdowns),
+            "histogram": {
+                "counts": dd_counts.tolist(),
+                "edges": dd_edges.tolist(),
+            },
+        },
+        "volatility": {
+            "horizon": float(final_returns.std(ddof=1)),
+            "annualized_mean": float(annual_vol.mean()),
+            "annualized_percentiles": _percentiles(annual_vol),
+        },
+        "sharpe": {
+            "risk_free_rate": float(risk_free_rate),
+            "mean": float(sharpe.mean()),
+            "percentiles": _percentiles(sharpe),
+        },
+    }
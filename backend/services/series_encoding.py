@@ -0,0 +1,98 @@
+import importlib.util
+import json
+from typing import Any, Dict, Optional
+import numpy as np
+from fastapi.responses import Response
+
+# Бинарные форматы ответа для рядов цен (выбираются по заголовку Accept)
+MEDIA_OCTET = "application/octet-stream"  # = float64
+MEDIA_FLOAT64 = "application/x-float64"
+MEDIA_FLOAT32 = "application/x-float32"
+MEDIA_ARROW = "application/vnd.apache.arrow.stream"
+MEDIA_JSON = "application/json"
+
+_RAW_DTYPES = {
+    MEDIA_OCTET: np.dtype("<f8"),
+    MEDIA_FLOAT64: np.dtype("<f8"),
+    MEDIA_FLOAT32: np.dtype("<f4"),
+}
+BINARY_MEDIA_TYPES = (*_RAW_DTYPES, MEDIA_ARROW)
+# заголовки бинарного ответа; браузер отдаёт их JS только через CORS expose_headers
+SERIES_HEADERS = ["X-Series-Columns", "X-Series-Length", "X-Series-Meta", "X-Series-Dtype"]
+# pyarrow — необязательная зависимость: без неё Arrow просто не предлагается
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+def negotiate_media_type(accept: Optional[str]) -> Optional[str]:
+    """
+    Возвращает бинарный media type из Accept или None, если клиенту нужен обычный JSON.
+    Берётся первый поддерживаемый тип в порядке перечисления в заголовке;
+    Arrow без pyarrow на сервере пропускается (дальше по списку или JSON).
+    """
+    if not accept:
+        return None
+    for part in accept.split(","):
+        media = part.split(";", 1)[0].strip().lower()
+        if media == MEDIA_ARROW and not HAS_PYARROW:
+            continue
+        if media in BINARY_MEDIA_TYPES:
+            return media
+        if media in (MEDIA_JSON, "*/*", "application/*"):
+            return None
+    return None
+
+def _encode_raw(columns: Dict[str, np.ndarray], dates: Optional[np.ndarray], dtype: np.dtype) -> bytes:
+    parts = []
+    if dates is not None:
+        parts.append(dates.astype("datetime64[D]").astype("<i8", copy=False).tobytes())
+    for values in columns.values():
+        parts.append(np.ascontiguousarray(values, dtype=dtype).tobytes())
+    return b"".join(parts)
+
+def _encode_arrow(columns: Dict[str, np.ndarray], dates: Optional[np.ndarray], meta: Dict[str, Any]) -> bytes:
+    import pyarrow as pa
+
+    arrays = {}
+    if dates is not None:
+        arrays["date"] = pa.array(dates.astype("datetime64[D]"), type=pa.date32())
+    for name, values in columns.items():
+        arrays[name] = pa.array(np.asarray(values, dtype=np.float64))
+    table = pa.table(arrays).replace_schema_metadata({"meta": json.dumps(meta)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def binary_series_response(
+    media_type: str,
+    columns: Dict[str, np.ndarray],
+    meta: Dict[str, Any],
+    dates: Optional[np.ndarray] = None,
+) -> Response:
+    """
+    Отдаёт ряды прямо из NumPy-массивов без поэлементной конвертации.
+
+    Сырые форматы (octet-stream / x-float64 / x-float32): подряд идут колонки одинаковой
+    длины — сначала даты (int64, дни от 1970-01-01), если есть, потом значения
+    (little-endian). Порядок колонок — в X-Series-Columns, длина — в X-Series-Length,
+    скалярные поля ответа — JSON в X-Series-Meta.
+    Arrow: IPC stream с колонкой date (date32) и float64-колонками.
+    """
+    length = len(next(iter(columns.values()))) if columns else 0
+    names = (["dates"] if dates is not None else []) + list(columns)
+    headers = {
+        "X-Series-Columns": ",".join(names),
+        "X-Series-Length": str(length),
+        "X-Series-Meta": json.dumps(meta),
+    }
+    if media_type == MEDIA_ARROW:
+        try:
+            body = _encode_arrow(columns, dates, meta)
+        except ImportError:
+            # negotiate_media_type уже не выбирает Arrow без pyarrow; сюда — только прямые вызовы
+            return Response(status_code=503, content="Arrow format requires pyarrow on the server")
+    else:
+        dtype = _RAW_DTYPES[media_type]
+        headers["X-Series-Dtype"] = dtype.name
+        body = _encode_raw(columns, dates, dtype)
+    return Response(content=body, media_type=media_type, headers=headers)
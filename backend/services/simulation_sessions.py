@@ -0,0 +1,176 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional, Union
+import numpy as np
+from services.average_mu import AssetParams, collect_asset_params, draw_shocks, shocks_to_prices
+
+SESSION_TTL_SECONDS = 15 * 60
+MAX_SESSIONS = 1000
+MAX_STEP_DRAWS = 1_000_000  # предел steps * n_assets за один вызов next_steps
+
+@dataclass
+class SimulationSession:
+    """
+    Состояние одной пошаговой симуляции портфеля: RNG и последние цены живут
+    на сервере, клиент забирает только новые шаги.
+    """
+    session_id: str
+    params: AssetParams
+    shares: np.ndarray
+    portfolio_start: float
+    rng: np.random.Generator
+    last_prices: np.ndarray
+    step: int = 0
+    last_access: float = field(default_factory=time.monotonic)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+_sessions: Dict[str, SimulationSession] = {}
+_sessions_lock = threading.Lock()
+
+def _evict_expired(now: float) -> None:
+    expired = [sid for sid, s in _sessions.items() if now - s.last_access > SESSION_TTL_SECONDS]
+    for sid in expired:
+        del _sessions[sid]
+
+def _get_session(session_id: str) -> SimulationSession:
+    now = time.monotonic()
+    with _sessions_lock:
+        _evict_expired(now)
+        session = _sessions.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        session.last_access = now
+    return session
+
+def _portfolio_change_rate(value: float, portfolio_start: float) -> float:
+    return (value - portfolio_start) / portfolio_start if portfolio_start > 0 else 0.0
+
+def create_session(
+    portfolio_start: float,
+    configs: List[Dict[str, Any]],
+    shares: List[Union[int, float]],
+    seed: Optional[int] = None,
+    correlated: bool = False,
+    mode: Literal["parametric", "bootstrap"] = "parametric",
+    block_size: int = 1,
+) -> Dict[str, Any]:
+    """
+    Создаёт сессию симуляции. Длина сессии и шаг по времени задаются n_steps конфигов.
+    """
+    if len(configs) != len(shares):
+        raise ValueError("configs length != shares length")
+
+    params = collect_asset_params(configs, correlated=correlated, mode=mode, block_size=block_size)
+    session = SimulationSession(
+        session_id=uuid.uuid4().hex,
+        params=params,
+        shares=np.asarray(shares, dtype=np.float64),
+        portfolio_start=float(portfolio_start),
+        rng=np.random.default_rng(seed),
+        last_prices=params.P0.copy(),
+    )
+
+    now = time.monotonic()
+    with _sessions_lock:
+        _evict_expired(now)
+        if len(_sessions) >= MAX_SESSIONS:
+            oldest = min(_sessions.values(), key=lambda s: s.last_access)
+            del _sessions[oldest.session_id]
+        _sessions[session.session_id] = session
+
+    return {
+        "session_id": session.session_id,
+        "n_steps": params.n_steps,
+        "ttl_seconds": SESSION_TTL_SECONDS,
+        "portfolio_start": session.portfolio_start,
+        "symbols": params.symbols,
+    }
+
+def next_steps(session_id: str, steps: int = 1, include_prices: bool = True) -> Dict[str, Any]:
+    """
+    Генерирует следующие steps шагов (не больше оставшихся) и возвращает только их.
+    """
+    if steps < 1:
+        raise ValueError("steps must be >= 1")
+    session = _get_session(session_id)
+
+    with session.lock:
+        params = session.params
+        k = min(steps, params.n_steps - session.step)
+        if k * params.P0.size > MAX_STEP_DRAWS:
+            raise ValueError("steps * assets must be <= {}".format(MAX_STEP_DRAWS))
+        if k > 0:
+            eps = draw_shocks(params, session.rng, (k,))
+            prices = shocks_to_prices(
+                eps, session.last_prices, params.mu_step, params.sigma_step,
+                params.clip_limit, params.chol,
+            )
+            session.last_prices = prices[:, -1].copy()
+            session.step += k
+        else:
+            prices = np.empty((params.P0.size, 0), dtype=np.float64)
+
+        portfolio_series = session.shares @ prices
+        portfolio_value = float(session.shares @ session.last_prices)
+        change_rates = (session.last_prices - params.base) / params.base
+
+        components: List[Dict[str, Any]] = []
+        for idx in range(params.P0.size):
+            comp: Dict[str, Any] = {}
+            if include_prices:
+                comp["prices"] = prices[idx].tolist()
+            comp["final_price"] = float(session.last_prices[idx])
+            comp["change_rate"] = float(change_rates[idx])
+            comp["symbol"] = params.symbols[idx]
+            comp["shares"] = float(session.shares[idx])
+            components.append(comp)
+
+        return {
+            "session_id": session.session_id,
+            "step": session.step,
+            "remaining": params.n_steps - session.step,
+            "done": session.step >= params.n_steps,
+            "portfolio_series": portfolio_series.tolist(),
+            "portfolio_final_value": portfolio_value,
+            "portfolio_change_rate": _portfolio_change_rate(portfolio_value, session.portfolio_start),
+            "components": components,
+        }
+
+def apply_shock(session_id: str, impacts: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Мгновенный скачок цены посреди сессии (например, влияние новости).
+    impacts: {symbol: изменение в процентах}, например {"AAPL": -3.0}.
+    """
+    session = _get_session(session_id)
+
+    with session.lock:
+        index = {sym: i for i, sym in enumerate(session.params.symbols)}
+        factors = np.ones(session.last_prices.size, dtype=np.float64)
+        for symbol, pct in impacts.items():
+            idx = index.get(symbol)
+            if idx is None:
+                idx = index.get(symbol.upper())
+            if idx is None:
+                raise ValueError("unknown symbol {} in session".format(symbol))
+            if pct <= -100:
+                raise ValueError("impact for {} must be > -100%".format(symbol))
+            factors[idx] *= 1.0 + float(pct) / 100.0
+        session.last_prices = session.last_prices * factors
+
+        portfolio_value = float(session.shares @ session.last_prices)
+        return {
+            "session_id": session.session_id,
+            "step": session.step,
+            "portfolio_final_value": portfolio_value,
+            "portfolio_change_rate": _portfolio_change_rate(portfolio_value, session.portfolio_start),
+            "last_prices": {
+                str(sym): float(p) for sym, p in zip(session.params.symbols, session.last_prices)
+            },
+        }
+
+def close_session(session_id: str) -> None:
+    with _sessions_lock:
+        if _sessions.pop(session_id, None) is None:
+            raise KeyError(session_id)
@@ -0,0 +1,6 @@
+# conftest.py
+import sys
+from pathlib import Path
+
+# тесты импортируют services.* так же, как app.py: от корня backend
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,27 @@
+# test_average_mu.py
+import numpy as np
+import pytest
+
+from services.average_mu import _step_params, simulate_price_series
+
+ARGS = dict(P0=100.0, mu_daily=0.0005, sigma_daily=0.02, nu=5, clip_limit=0.05, seed=42)
+
+
+def loop_price_series(P0, mu_daily, sigma_daily, n_steps, nu, clip_limit, seed, trend):
+    # прежняя реализация: цена шаг за шагом в цикле Python
+    rng = np.random.default_rng(seed)
+    mu_step, sigma_step = _step_params(mu_daily, sigma_daily, n_steps, trend)
+    eps = np.clip(rng.standard_t(df=nu, size=n_steps) * sigma_step, -clip_limit, clip_limit)
+    price = np.empty(n_steps, dtype=float)
+    price[0] = P0 * np.exp(mu_step + eps[0])
+    for t in range(1, n_steps):
+        price[t] = price[t - 1] * np.exp(mu_step + eps[t])
+    return price
+
+
+@pytest.mark.parametrize("trend", ["standard", "up", "down"])
+@pytest.mark.parametrize("n_steps", [1, 2, 390, 10_000])
+def test_simulate_price_series_matches_loop(trend, n_steps):
+    old = loop_price_series(n_steps=n_steps, trend=trend, **ARGS)
+    new = simulate_price_series(n_steps=n_steps, trend=trend, as_array=True, **ARGS)
+    np.testing.assert_allclose(new["prices"], old, rtol=1e-9, atol=0.0)